@@ -0,0 +1,65 @@
+# -*- mode: python ; coding: utf-8 -*-
+# PyInstaller spec for the calculator.
+#
+# Builds a one-folder (--onedir) bundle. A one-file build unpacks the whole
+# Python runtime into a temp directory on every launch, which costs several
+# seconds of startup on Windows; the one-folder layout starts directly.
+#
+#     pyinstaller calc.spec
+#
+# The result is dist/calc/calc(.exe); ship the whole dist/calc folder.
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    # src.core.imports loads these lazily by name, so PyInstaller's import
+    # scan cannot see them. Of its other lazy names, json and threading are
+    # also imported normally; requests, asyncio and concurrent.futures are
+    # only re-exported and unused by the app, so they are left out.
+    hiddenimports=[
+        'PySide6.QtPrintSupport',  # QPrinter/QPrintDialog for File > Print
+        'numpy',
+        'scipy',
+        'scipy.linalg',
+        'scipy.optimize',
+        'scipy.integrate',
+        'scipy.stats',
+        'sympy',
+        'pyqtgraph',
+        # Optional plot backends; bundled when installed at build time
+        'numexpr',
+        'numba',
+        'llvmlite',
+    ],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['tkinter'],
+    noarchive=False,
+    # Equivalent of python -O: strips the startup tracing in main.py
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='calc',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='calc',
+)
@@ -2,40 +2,147 @@
 Main entry point for the calculator application
 """
 
+import logging
+import os
 import sys
-from src.core.imports import *
-
-
-def launch_app():
-    """Launch the calculator GUI application."""
-    try:
-        print("Starting Advanced Scientific Calculator...")
-        app = QApplication(sys.argv)
-        app.setApplicationName("Advanced Scientific Calculator")
-        app.setApplicationVersion("2.0")
-        app.setOrganizationName("Scientific Calculator")
-        print("QApplication created successfully")
-
-        # Import the main calculator class
-        from src.core.calculator import ScientificCalculator
-        
-        print("Creating main window...")
-        main_win = ScientificCalculator()
-        print("Main window created successfully")
-        
-        main_win.show()
-        print("Main window shown, starting event loop...")
-
-        # Start the event loop
-        result = app.exec()
-        print(f"Event loop finished with result: {result}")
-        sys.exit(result)
-        
-    except Exception as e:
-        print(f"Error launching application: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+from types import TracebackType
+from typing import NoReturn, Optional, Type
+
+from PySide6.QtCore import QCoreApplication, QThreadPool
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+from PySide6.QtWidgets import QApplication, QMainWindow
+
+log = logging.getLogger("calc")
+log.setLevel(logging.DEBUG if os.environ.get("CALC_DEBUG") else logging.WARNING)
+
+SINGLETON_NAME = "calctermpy-singleton"
+
+
+def _log_unhandled(
+    exc_type: Type[BaseException], exc: BaseException, tb: Optional[TracebackType]
+) -> None:
+    """Report uncaught exceptions through the calc logger"""
+    log.critical("unhandled exception", exc_info=(exc_type, exc, tb))
+
+
+def _raise_running_instance() -> bool:
+    """Ask an already running calculator to raise its window.
+
+    Returns True if another instance answered, in which case this process
+    should exit without creating a QApplication.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(SINGLETON_NAME)
+    if not socket.waitForConnected(100):
+        return False
+    socket.write(b"raise\n")
+    socket.waitForBytesWritten(100)
+    socket.disconnectFromServer()
+    return True
+
+
+def _listen_for_instances(main_win: QMainWindow) -> Optional[QLocalServer]:
+    """Raise main_win whenever a later launch connects to the singleton server"""
+    server = QLocalServer(main_win)
+    if not server.listen(SINGLETON_NAME):
+        # A previous instance that crashed can leave a stale socket behind
+        QLocalServer.removeServer(SINGLETON_NAME)
+        if not server.listen(SINGLETON_NAME):
+            log.debug("Single-instance server unavailable: %s", server.errorString())
+            return None
+
+    def on_new_connection() -> None:
+        while server.hasPendingConnections():
+            server.nextPendingConnection().deleteLater()
+        if main_win.isMinimized():
+            main_win.showNormal()
+        main_win.raise_()
+        main_win.activateWindow()
+
+    server.newConnection.connect(on_new_connection)
+    return server
+
+
+def _preselect_platform() -> None:
+    """Pick the Qt platform plugin up front so QApplication skips probing.
+
+    An explicit QT_QPA_PLATFORM setting from the environment wins. The
+    OpenGL implementation is left to Qt: set QT_OPENGL=software on machines
+    whose GL driver is missing or broken.
+    """
+    if sys.platform.startswith("linux") and os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        os.environ.setdefault("QT_QPA_PLATFORM", "xcb")
+
+
+def _configure_app() -> None:
+    """Register application metadata with Qt.
+
+    Called before QApplication exists, so the static setters just store the
+    values and no *Changed signals are emitted.
+    """
+    QCoreApplication.setApplicationName("Advanced Scientific Calculator")
+    QCoreApplication.setApplicationVersion("2.0")
+    QCoreApplication.setOrganizationName("Scientific Calculator")
+
+
+def launch_app() -> NoReturn:
+    """Launch the calculator GUI application.
+
+    Set the CALC_DEBUG environment variable to log startup progress; the
+    tracing is compiled out when Python runs with -O.
+    The calculator takes no arguments of its own; the command line is only
+    handed to Qt when it contains options (e.g. -platform, -style).
+    """
+    # Installed here rather than at import, so importing main leaves the
+    # interpreter's hook alone
+    sys.excepthook = _log_unhandled
+    if __debug__ and log.isEnabledFor(logging.DEBUG):
+        logging.basicConfig(format="%(name)s: %(message)s")
+    if _raise_running_instance():
+        if __debug__:
+            log.debug("Calculator already running, raised existing window")
+        sys.exit(0)
+
+    if __debug__:
+        log.debug("Starting Advanced Scientific Calculator...")
+    _preselect_platform()
+    _configure_app()
+    argv = sys.argv if any(a.startswith("-") for a in sys.argv[1:]) else sys.argv[:1]
+    app = QApplication(argv)
+    if __debug__:
+        log.debug("QApplication created successfully")
+
+    # Populating the font database scans the system fonts; let a pool thread
+    # do it while this thread imports the calculator modules
+    QThreadPool.globalInstance().start(QFontDatabase.families)
+
+    # Import the main calculator class
+    from src.core.calculator import ScientificCalculator
+
+    if __debug__:
+        log.debug("Creating main window...")
+    main_win = ScientificCalculator()
+    if __debug__:
+        log.debug("Main window created successfully")
+
+    main_win.show()
+    # The process ends with os._exit(), which skips the QSettings destructors
+    app.aboutToQuit.connect(main_win.sync_settings)
+    _listen_for_instances(main_win)
+    if __debug__:
+        log.debug("Main window shown, starting event loop...")
+
+    # Start the event loop
+    result = app.exec()
+    if __debug__:
+        log.debug("Event loop finished with result: %s", result)
+    # Skip interpreter teardown (atexit, module finalizers, collecting the
+    # dead Qt object graph); everything that needs saving was written on
+    # aboutToQuit
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(result)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ Includes AI chatbot for code assistance and debugging
 """
 
 import sys
+import ast
 import math
 import random
 import statistics
@@ -15,6 +16,10 @@ import decimal
 import fractions
 import traceback
 import re
+import io
+import tokenize
+import types
+from functools import cached_property, lru_cache, partial
 from typing import Dict, Any
 import threading
 import asyncio
@@ -70,12 +75,15 @@ from PySide6.QtWidgets import (
     QDockWidget, QTreeWidget, QTreeWidgetItem, QHeaderView, QListWidget,
     QListWidgetItem, QFileDialog, QSlider, QCheckBox
 )
-from PySide6.QtCore import Qt, QSettings, QTimer, QRegularExpression, QSize
+from PySide6.QtCore import Qt, QSettings, QTimer, QRegularExpression, QSize, Slot
 from PySide6.QtGui import (QFont, QColor, QAction, QTextCursor, QTextCharFormat, 
                           QSyntaxHighlighter, QTextDocument, QPainter)
-from PySide6.QtPrintSupport import QPrintDialog, QPrinter
 import re
 
+# Globals for every eval of user input; eval only reads them, so one dict
+# is shared instead of building a new one per line
+_EVAL_GLOBALS = {"__builtins__": {}}
+
 
 class GraphPlotWidget(QWidget):
     """Widget for plotting mathematical functions"""
@@ -175,7 +183,7 @@ class GraphPlotWidget(QWidget):
                 namespace['scipy'] = sp
                 
             # Evaluate function
-            y = eval(func_text, {"__builtins__": {}}, namespace)
+            y = eval(func_text, _EVAL_GLOBALS, namespace)
             
             # Plot
             self.ax.clear()
@@ -778,12 +786,273 @@ class CodeEditor(QPlainTextEdit):
         self.line_results[line_number] = result
         self.update()  # Trigger repaint
     
+    def set_line_results(self, results):
+        """Replace all results at once from a dict of line number -> result.
+        
+        The text area is repainted once instead of line by line, and not at
+        all when the results are the ones already shown.
+        """
+        results = dict(results)
+        if results == self.line_results:
+            return
+        self.line_results = results
+        self.viewport().update()
+    
     def clear_line_results(self):
         """Clear all inline results"""
         self.line_results.clear()
         self.update()
 
 
+# Name and inserted text of the toolbar buttons and menu entries; built once
+# at import rather than on every setup_* call
+TOOLBAR_FUNCTIONS = (
+    ("π", "math.pi"),
+    ("e", "math.e"),
+    ("sin", "math.sin("),
+    ("cos", "math.cos("),
+    ("tan", "math.tan("),
+    ("√", "math.sqrt("),
+    ("log", "math.log("),
+    ("ln", "math.log("),
+    ("x²", "**2"),
+    ("x^y", "**"),
+)
+
+TRIG_FUNCTIONS = (
+    ("sin(x)", "math.sin("),
+    ("cos(x)", "math.cos("),
+    ("tan(x)", "math.tan("),
+    ("asin(x)", "math.asin("),
+    ("acos(x)", "math.acos("),
+    ("atan(x)", "math.atan("),
+    ("atan2(y,x)", "math.atan2("),
+    ("sinh(x)", "math.sinh("),
+    ("cosh(x)", "math.cosh("),
+    ("tanh(x)", "math.tanh("),
+    ("asinh(x)", "math.asinh("),
+    ("acosh(x)", "math.acosh("),
+    ("atanh(x)", "math.atanh("),
+)
+
+LOG_FUNCTIONS = (
+    ("exp(x)", "math.exp("),
+    ("log(x)", "math.log("),
+    ("log10(x)", "math.log10("),
+    ("log2(x)", "math.log2("),
+    ("log(x, base)", "math.log("),
+    ("pow(x, y)", "math.pow("),
+    ("sqrt(x)", "math.sqrt("),
+)
+
+UTIL_FUNCTIONS = (
+    ("abs(x)", "abs("),
+    ("ceil(x)", "math.ceil("),
+    ("floor(x)", "math.floor("),
+    ("round(x)", "round("),
+    ("trunc(x)", "math.trunc("),
+    ("fabs(x)", "math.fabs("),
+    ("gcd(a, b)", "math.gcd("),
+    ("lcm(a, b)", "math.lcm("),
+    ("factorial(x)", "math.factorial("),
+    ("comb(n, k)", "math.comb("),
+    ("perm(n, k)", "math.perm("),
+)
+
+SPECIAL_FUNCTIONS = (
+    ("gamma(x)", "math.gamma("),
+    ("lgamma(x)", "math.lgamma("),
+    ("erf(x)", "math.erf("),
+    ("erfc(x)", "math.erfc("),
+    ("degrees(x)", "math.degrees("),
+    ("radians(x)", "math.radians("),
+)
+
+RANDOM_FUNCTIONS = (
+    ("random()", "random.random()"),
+    ("randint(a, b)", "random.randint("),
+    ("uniform(a, b)", "random.uniform("),
+    ("choice(seq)", "random.choice("),
+    ("shuffle(seq)", "random.shuffle("),
+    ("sample(seq, k)", "random.sample("),
+    ("seed(n)", "random.seed("),
+)
+
+STATISTICS_FUNCTIONS = (
+    ("mean(data)", "statistics.mean("),
+    ("median(data)", "statistics.median("),
+    ("mode(data)", "statistics.mode("),
+    ("stdev(data)", "statistics.stdev("),
+    ("variance(data)", "statistics.variance("),
+    ("harmonic_mean(data)", "statistics.harmonic_mean("),
+    ("multimode(data)", "statistics.multimode("),
+)
+
+CMATH_FUNCTIONS = (
+    ("sqrt(z)", "cmath.sqrt("),
+    ("exp(z)", "cmath.exp("),
+    ("log(z)", "cmath.log("),
+    ("sin(z)", "cmath.sin("),
+    ("cos(z)", "cmath.cos("),
+    ("tan(z)", "cmath.tan("),
+    ("phase(z)", "cmath.phase("),
+    ("polar(z)", "cmath.polar("),
+    ("rect(r, phi)", "cmath.rect("),
+)
+
+DECIMAL_FUNCTIONS = (
+    ("Decimal('0.1')", "decimal.Decimal('"),
+    ("getcontext()", "decimal.getcontext()"),
+    ("setcontext(ctx)", "decimal.setcontext("),
+    ("localcontext()", "decimal.localcontext()"),
+)
+
+FRACTIONS_FUNCTIONS = (
+    ("Fraction(1, 3)", "fractions.Fraction("),
+    ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
+    ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
+)
+
+MATH_CONSTANTS = (
+    ("π (pi)", "math.pi"),
+    ("e (Euler's number)", "math.e"),
+    ("τ (tau = 2π)", "math.tau"),
+    ("∞ (infinity)", "math.inf"),
+    ("NaN", "math.nan"),
+)
+
+NUMPY_CONSTANTS = (
+    ("np.pi", "np.pi"),
+    ("np.e", "np.e"),
+    ("np.inf", "np.inf"),
+    ("np.nan", "np.nan"),
+)
+
+SYMPY_CONSTANTS = (
+    ("sym.pi", "sym.pi"),
+    ("sym.E", "sym.E"),
+    ("sym.I (imaginary unit)", "sym.I"),
+    ("sym.oo (infinity)", "sym.oo"),
+    ("sym.zoo (complex infinity)", "sym.zoo"),
+)
+
+# Submenus of the Math menu, then the menus that follow it in the menu bar
+MATH_SUBMENUS = (
+    ("Trigonometric", TRIG_FUNCTIONS),
+    ("Logarithmic & Exponential", LOG_FUNCTIONS),
+    ("Number Theory & Utilities", UTIL_FUNCTIONS),
+    ("Special Functions", SPECIAL_FUNCTIONS),
+)
+
+INSERT_MENUS = (
+    ("Random", RANDOM_FUNCTIONS),
+    ("Statistics", STATISTICS_FUNCTIONS),
+    ("Complex Math (cmath)", CMATH_FUNCTIONS),
+    ("Decimal", DECIMAL_FUNCTIONS),
+    ("Fractions", FRACTIONS_FUNCTIONS),
+)
+
+# Dock widget attribute of each panel named in the panel configuration
+PANEL_DOCKS = {
+    "history": "history_dock",
+    "functions": "functions_dock",
+    "graph": "graph_dock",
+    "variables": "variables_dock",
+}
+
+# Document lines are recompiled on every recalculation although most of them
+# are unchanged, so the code objects are kept per (source, filename, mode)
+_compile_code = lru_cache(maxsize=1024)(compile)
+
+# Line prefixes that start a multi-line statement, and the clauses that
+# continue one at the same indentation
+BLOCK_KEYWORDS = (
+    'def ', 'class ', 'if ', 'for ', 'while ', 'try:', 'except', 'finally:',
+    'with ', 'elif ', 'else:',
+)
+CLAUSE_KEYWORDS = ('elif ', 'elif(', 'else:', 'else ', 'except', 'finally:', 'finally ')
+
+
+@lru_cache(maxsize=1024)
+def _ends_with_colon_before_comment(line):
+    """Whether a line ends with ':' followed by a comment, e.g. ``match x:  # ...``.
+    
+    The line is tokenized so a '#' inside a string is not taken for a comment.
+    """
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(line).readline):
+            if token.type == tokenize.COMMENT:
+                return line[:token.start[1]].rstrip().endswith(':')
+    except (tokenize.TokenError, SyntaxError):
+        # Unterminated string or bracket: not a block header
+        pass
+    return False
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _format_number(result, precision):
+    """Format a bool, int, float or complex result.
+    
+    Documents show the same values again on every recalculation, so the
+    strings are cached per value, type and precision.
+    """
+    if isinstance(result, bool):
+        return str(result)
+    elif isinstance(result, (int, float)):
+        if isinstance(result, float):
+            # Use scientific notation for very large or very small numbers
+            if abs(result) > 1e10 or (abs(result) < 1e-4 and result != 0):
+                return f"{result:.{precision}e}"
+            else:
+                return f"{result:.{precision}g}"
+        else:
+            return str(result)
+    elif result.imag == 0:
+        # Uncached, as a -0.0 real part would find the entry for 0.0
+        return _format_number.__wrapped__(result.real, precision)
+    elif result.real == 0:
+        return f"{result.imag:.{precision}g}j"
+    else:
+        return f"({result.real:.{precision}g}{'+' if result.imag >= 0 else ''}{result.imag:.{precision}g}j)"
+
+
+@lru_cache(maxsize=1024)
+def _parse_assignment(source):
+    """Split a line assigning to plain names (``a = 1``, ``a = b = 1``).
+    
+    Returns the target names and the source of the assigned expression, or
+    None for any other line, including comparisons and keyword arguments.
+    Raises SyntaxError for a line that is not valid Python.
+    """
+    source = source.strip()
+    tree = ast.parse(source, '<string>')
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.Assign):
+        return None
+    statement = tree.body[0]
+    if not all(isinstance(target, ast.Name) for target in statement.targets):
+        return None
+    return (
+        tuple(target.id for target in statement.targets),
+        ast.get_source_segment(source, statement.value),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _compile_block(source):
+    """Compile a multi-line block for execute_multiline_code.
+    
+    Returns the code of its statements and, when the last statement is an
+    expression, the code evaluating it (else None), so that statement runs
+    once and its value is still shown.
+    """
+    tree = ast.parse(source, '<calculator>')
+    expression_code = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        expression = ast.Expression(tree.body.pop().value)
+        expression_code = compile(expression, '<calculator>', 'eval')
+    return compile(tree, '<calculator>', 'exec'), expression_code
+
+
 class ScientificCalculator(QMainWindow):
     """Main calculator application window"""
     
@@ -897,8 +1166,16 @@ class ScientificCalculator(QMainWindow):
         self.document_undo_stacks = {}
         
         self.line_results = {}
-        self.last_text = ""
-        self.calculation_timer = None
+        # Editor and text of the last calculation pass
+        self.last_calculation = None
+        
+        # One restartable timer coalesces bursts of keystrokes into a single
+        # recalculation of the editor that changed last
+        self.pending_calculation_editor = None
+        self.calculation_timer = QTimer(self)
+        self.calculation_timer.setSingleShot(True)
+        self.calculation_timer.setInterval(500)  # Wait 500ms after last keystroke
+        self.calculation_timer.timeout.connect(self.run_pending_calculation)
     
     def setup_dock_widgets(self):
         """Setup dock widgets for additional features"""
@@ -915,16 +1192,17 @@ class ScientificCalculator(QMainWindow):
         self.history_dock.setWidget(self.history_widget)
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.history_dock)
         
-        # 3. Custom functions dock
+        # 3. Custom functions dock; it starts behind the history tab, so its
+        # contents are only built once it is shown
         self.functions_dock = QDockWidget("Custom Functions", self)
-        self.functions_widget = CustomFunctionLibrary(self)
-        self.functions_dock.setWidget(self.functions_widget)
+        self.functions_widget = None
+        self.functions_dock.visibilityChanged.connect(self.on_functions_dock_visibility_changed)
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.functions_dock)
         
-        # 4. Variable inspector dock
+        # 4. Variable inspector dock; behind the graph tab, built when shown
         self.variables_dock = QDockWidget("Variable Inspector", self)
-        self.variables_widget = VariableInspector(self)
-        self.variables_dock.setWidget(self.variables_widget)
+        self.variables_widget = None
+        self.variables_dock.visibilityChanged.connect(self.on_variables_dock_visibility_changed)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.variables_dock)
         
         # Tabify left docks
@@ -937,6 +1215,19 @@ class ScientificCalculator(QMainWindow):
         self.history_dock.raise_()
         self.graph_dock.raise_()
     
+    def on_functions_dock_visibility_changed(self, visible):
+        """Create the custom function library the first time its dock is shown"""
+        if visible and self.functions_widget is None:
+            self.functions_widget = CustomFunctionLibrary(self)
+            self.functions_dock.setWidget(self.functions_widget)
+    
+    def on_variables_dock_visibility_changed(self, visible):
+        """Create the variable inspector the first time its dock is shown"""
+        if visible and self.variables_widget is None:
+            self.variables_widget = VariableInspector(self)
+            self.variables_dock.setWidget(self.variables_widget)
+            self.update_variables_display()
+    
     def create_new_document(self, title="Document"):
         """Create a new document tab"""
         # Create document widget
@@ -946,9 +1237,10 @@ class ScientificCalculator(QMainWindow):
         
         # Custom code editor with line numbers and inline results
         document_editor = CodeEditor()
+        document_editor.setObjectName("calcEditor")  # Styled by apply_styling
         document_editor.setPlaceholderText("Type your mathematical expressions here...\nPress Enter at end of line to calculate\nClick anywhere to position cursor")
-        document_editor.textChanged.connect(lambda: self.on_text_changed(document_editor))
-        document_editor.cursorPositionChanged.connect(lambda: self.on_cursor_changed(document_editor))
+        document_editor.textChanged.connect(partial(self.on_text_changed, document_editor))
+        document_editor.cursorPositionChanged.connect(partial(self.on_cursor_changed, document_editor))
         
         # Apply Python syntax highlighting
         highlighter = PythonSyntaxHighlighter(document_editor.document())
@@ -959,13 +1251,13 @@ class ScientificCalculator(QMainWindow):
         button_layout = QHBoxLayout()
         
         clear_btn = QPushButton("Clear Document")
-        clear_btn.clicked.connect(lambda: self.clear_current_document())
+        clear_btn.clicked.connect(self.clear_current_document)
         
         clear_vars_btn = QPushButton("Clear Variables")
         clear_vars_btn.clicked.connect(self.clear_variables)
         
         recalc_btn = QPushButton("Recalculate All")
-        recalc_btn.clicked.connect(lambda: self.recalculate_all(document_editor))
+        recalc_btn.clicked.connect(partial(self.recalculate_all, document_editor))
         
         button_layout.addWidget(clear_btn)
         button_layout.addWidget(clear_vars_btn)
@@ -981,6 +1273,7 @@ class ScientificCalculator(QMainWindow):
         # Store editor reference
         doc_widget.editor = document_editor
         doc_widget.highlighter = highlighter
+        doc_widget.highlighter_theme = "dark"  # Rules set up by the highlighter
         
         return document_editor
     
@@ -1010,12 +1303,20 @@ class ScientificCalculator(QMainWindow):
         self.variables.clear()
         self.line_results.clear()
         self.namespace = self.base_namespace.copy()
-        self.variables_widget.update_variables({})
+        self.update_variables_display()
 
     def setup_menu_bar(self):
         """Setup the menu bar"""
         menubar = self.menuBar()
-        
+        # Lay out and paint the menu bar once, after all menus are added
+        menubar.setUpdatesEnabled(False)
+        try:
+            self.add_menus(menubar)
+        finally:
+            menubar.setUpdatesEnabled(True)
+    
+    def add_menus(self, menubar):
+        """Add the application menus to the menu bar"""
         # File menu
         file_menu = menubar.addMenu("File")
         
@@ -1096,16 +1397,8 @@ class ScientificCalculator(QMainWindow):
         theme_action.triggered.connect(self.open_theme_customizer)
         view_menu.addAction(theme_action)
         
-        # Math Functions menu
-        self.setup_math_menu(menubar)
-        self.setup_random_menu(menubar)
-        self.setup_statistics_menu(menubar)
-        self.setup_cmath_menu(menubar)
-        self.setup_decimal_menu(menubar)
-        self.setup_fractions_menu(menubar)
-        
-        # Constants menu
-        self.setup_constants_menu(menubar)
+        # Math Functions, library and Constants menus
+        self.setup_insert_menus(menubar)
         
         # Help menu
         help_menu = menubar.addMenu("Help")
@@ -1113,1156 +1406,67 @@ class ScientificCalculator(QMainWindow):
         help_action = QAction("Help", self)
         help_action.triggered.connect(self.show_help)
         help_menu.addAction(help_action)
-        
-    def setup_toolbar(self):
-        """Setup the toolbar with quick actions"""
-        toolbar = QToolBar()
-        self.addToolBar(toolbar)
-        
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
-        
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
-        
-    def setup_math_menu(self, menubar):
-        """Setup the Math Functions menu"""
-        math_menu = menubar.addMenu("Math")
-        
-        # Trigonometric functions
-        trig_menu = math_menu.addMenu("Trigonometric")
-        trig_functions = [
-            ("sin(x)", "math.sin("),
-            ("cos(x)", "math.cos("),
-            ("tan(x)", "math.tan("),
-            ("asin(x)", "math.asin("),
-            ("acos(x)", "math.acos("),
-            ("atan(x)", "math.atan("),
-            ("atan2(y,x)", "math.atan2("),
-            ("sinh(x)", "math.sinh("),
-            ("cosh(x)", "math.cosh("),
-            ("tanh(x)", "math.tanh("),
-            ("asinh(x)", "math.asinh("),
-            ("acosh(x)", "math.acosh("),
-            ("atanh(x)", "math.atanh("),
-        ]
-        for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
-        
-        # Logarithmic and exponential
-        log_menu = math_menu.addMenu("Logarithmic & Exponential")
-        log_functions = [
-            ("exp(x)", "math.exp("),
-            ("log(x)", "math.log("),
-            ("log10(x)", "math.log10("),
-            ("log2(x)", "math.log2("),
-            ("log(x, base)", "math.log("),
-            ("pow(x, y)", "math.pow("),
-            ("sqrt(x)", "math.sqrt("),
-        ]
-        for name, func in log_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            log_menu.addAction(action)
-        
-        # Number theory and utilities
-        util_menu = math_menu.addMenu("Number Theory & Utilities")
-        util_functions = [
-            ("abs(x)", "abs("),
-            ("ceil(x)", "math.ceil("),
-            ("floor(x)", "math.floor("),
-            ("round(x)", "round("),
-            ("trunc(x)", "math.trunc("),
-            ("fabs(x)", "math.fabs("),
-            ("gcd(a, b)", "math.gcd("),
-            ("lcm(a, b)", "math.lcm("),
-            ("factorial(x)", "math.factorial("),
-            ("comb(n, k)", "math.comb("),
-            ("perm(n, k)", "math.perm("),
-        ]
-        for name, func in util_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            util_menu.addAction(action)
-        
-        # Special functions
-        special_menu = math_menu.addMenu("Special Functions")
-        special_functions = [
-            ("gamma(x)", "math.gamma("),
-            ("lgamma(x)", "math.lgamma("),
-            ("erf(x)", "math.erf("),
-            ("erfc(x)", "math.erfc("),
-            ("degrees(x)", "math.degrees("),
-            ("radians(x)", "math.radians("),
-        ]
-        for name, func in special_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            special_menu.addAction(action)
-    
-    def setup_random_menu(self, menubar):
-        """Setup the Random menu"""
-        random_menu = menubar.addMenu("Random")
-        random_functions = [
-            ("random()", "random.random()"),
-            ("randint(a, b)", "random.randint("),
-            ("uniform(a, b)", "random.uniform("),
-            ("choice(seq)", "random.choice("),
-            ("shuffle(seq)", "random.shuffle("),
-            ("sample(seq, k)", "random.sample("),
-            ("seed(n)", "random.seed("),
-        ]
-        for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
-
-    def setup_statistics_menu(self, menubar):
-        """Setup the Statistics menu"""
-        stats_menu = menubar.addMenu("Statistics")
-        stats_functions = [
-            ("mean(data)", "statistics.mean("),
-            ("median(data)", "statistics.median("),
-            ("mode(data)", "statistics.mode("),
-            ("stdev(data)", "statistics.stdev("),
-            ("variance(data)", "statistics.variance("),
-            ("harmonic_mean(data)", "statistics.harmonic_mean("),
-            ("multimode(data)", "statistics.multimode("),
-        ]
-        for name, func in stats_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
-
-    def setup_cmath_menu(self, menubar):
-        """Setup the Complex Math menu"""
-        cmath_menu = menubar.addMenu("Complex Math (cmath)")
-        cmath_functions = [
-            ("sqrt(z)", "cmath.sqrt("),
-            ("exp(z)", "cmath.exp("),
-            ("log(z)", "cmath.log("),
-            ("sin(z)", "cmath.sin("),
-            ("cos(z)", "cmath.cos("),
-            ("tan(z)", "cmath.tan("),
-            ("phase(z)", "cmath.phase("),
-            ("polar(z)", "cmath.polar("),
-            ("rect(r, phi)", "cmath.rect("),
-        ]
-        for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
-
-    def setup_decimal_menu(self, menubar):
-        """Setup the Decimal menu"""
-        decimal_menu = menubar.addMenu("Decimal")
-        decimal_functions = [
-            ("Decimal('0.1')", "decimal.Decimal('"),
-            ("getcontext()", "decimal.getcontext()"),
-            ("setcontext(ctx)", "decimal.setcontext("),
-            ("localcontext()", "decimal.localcontext()"),
-        ]
-        for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
-
-    def setup_fractions_menu(self, menubar):
-        """Setup the Fractions menu"""
-        fractions_menu = menubar.addMenu("Fractions")
-        fractions_functions = [
-            ("Fraction(1, 3)", "fractions.Fraction("),
-            ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
-            ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
-            ("gcd(a, b)", "fractions.gcd("),
-        ]
-        for name, func in fractions_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
-
-    def setup_constants_menu(self, menubar):
-        """Setup the Constants menu"""
-        constants_menu = menubar.addMenu("Constants")
-        # Mathematical constants
-        math_constants = [
-            ("π (pi)", "math.pi"),
-            ("e (Euler's number)", "math.e"),
-            ("τ (tau = 2π)", "math.tau"),
-            ("∞ (infinity)", "math.inf"),
-            ("NaN", "math.nan"),
-        ]
-        for name, const in math_constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
-        # NumPy constants
-        if 'np' in self.base_namespace:
-            constants_menu.addSeparator()
-            numpy_constants = [
-                ("np.pi", "np.pi"),
-                ("np.e", "np.e"),
-                ("np.inf", "np.inf"),
-                ("np.nan", "np.nan"),
-            ]
-            for name, const in numpy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-        # SymPy constants
-        if 'sym' in self.base_namespace:
-            constants_menu.addSeparator()
-            sympy_constants = [
-                ("sym.pi", "sym.pi"),
-                ("sym.E", "sym.E"),
-                ("sym.I (imaginary unit)", "sym.I"),
-                ("sym.oo (infinity)", "sym.oo"),
-                ("sym.zoo (complex infinity)", "sym.zoo"),
-            ]
-            for name, const in sympy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-
-    def setup_toolbar(self):
-        """Setup the toolbar with quick actions"""
-        toolbar = QToolBar()
-        self.addToolBar(toolbar)
-        
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
-        
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
-        
-    def setup_math_menu(self, menubar):
-        """Setup the Math Functions menu"""
-        math_menu = menubar.addMenu("Math")
-        
-        # Trigonometric functions
-        trig_menu = math_menu.addMenu("Trigonometric")
-        trig_functions = [
-            ("sin(x)", "math.sin("),
-            ("cos(x)", "math.cos("),
-            ("tan(x)", "math.tan("),
-            ("asin(x)", "math.asin("),
-            ("acos(x)", "math.acos("),
-            ("atan(x)", "math.atan("),
-            ("atan2(y,x)", "math.atan2("),
-            ("sinh(x)", "math.sinh("),
-            ("cosh(x)", "math.cosh("),
-            ("tanh(x)", "math.tanh("),
-            ("asinh(x)", "math.asinh("),
-            ("acosh(x)", "math.acosh("),
-            ("atanh(x)", "math.atanh("),
-        ]
-        for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
-        
-        # Logarithmic and exponential
-        log_menu = math_menu.addMenu("Logarithmic & Exponential")
-        log_functions = [
-            ("exp(x)", "math.exp("),
-            ("log(x)", "math.log("),
-            ("log10(x)", "math.log10("),
-            ("log2(x)", "math.log2("),
-            ("log(x, base)", "math.log("),
-            ("pow(x, y)", "math.pow("),
-            ("sqrt(x)", "math.sqrt("),
-        ]
-        for name, func in log_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            log_menu.addAction(action)
-        
-        # Number theory and utilities
-        util_menu = math_menu.addMenu("Number Theory & Utilities")
-        util_functions = [
-            ("abs(x)", "abs("),
-            ("ceil(x)", "math.ceil("),
-            ("floor(x)", "math.floor("),
-            ("round(x)", "round("),
-            ("trunc(x)", "math.trunc("),
-            ("fabs(x)", "math.fabs("),
-            ("gcd(a, b)", "math.gcd("),
-            ("lcm(a, b)", "math.lcm("),
-            ("factorial(x)", "math.factorial("),
-            ("comb(n, k)", "math.comb("),
-            ("perm(n, k)", "math.perm("),
-        ]
-        for name, func in util_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            util_menu.addAction(action)
-        
-        # Special functions
-        special_menu = math_menu.addMenu("Special Functions")
-        special_functions = [
-            ("gamma(x)", "math.gamma("),
-            ("lgamma(x)", "math.lgamma("),
-            ("erf(x)", "math.erf("),
-            ("erfc(x)", "math.erfc("),
-            ("degrees(x)", "math.degrees("),
-            ("radians(x)", "math.radians("),
-        ]
-        for name, func in special_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            special_menu.addAction(action)
-    
-    def setup_random_menu(self, menubar):
-        """Setup the Random menu"""
-        random_menu = menubar.addMenu("Random")
-        random_functions = [
-            ("random()", "random.random()"),
-            ("randint(a, b)", "random.randint("),
-            ("uniform(a, b)", "random.uniform("),
-            ("choice(seq)", "random.choice("),
-            ("shuffle(seq)", "random.shuffle("),
-            ("sample(seq, k)", "random.sample("),
-            ("seed(n)", "random.seed("),
-        ]
-        for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
-
-    def setup_statistics_menu(self, menubar):
-        """Setup the Statistics menu"""
-        stats_menu = menubar.addMenu("Statistics")
-        stats_functions = [
-            ("mean(data)", "statistics.mean("),
-            ("median(data)", "statistics.median("),
-            ("mode(data)", "statistics.mode("),
-            ("stdev(data)", "statistics.stdev("),
-            ("variance(data)", "statistics.variance("),
-            ("harmonic_mean(data)", "statistics.harmonic_mean("),
-            ("multimode(data)", "statistics.multimode("),
-        ]
-        for name, func in stats_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
-
-    def setup_cmath_menu(self, menubar):
-        """Setup the Complex Math menu"""
-        cmath_menu = menubar.addMenu("Complex Math (cmath)")
-        cmath_functions = [
-            ("sqrt(z)", "cmath.sqrt("),
-            ("exp(z)", "cmath.exp("),
-            ("log(z)", "cmath.log("),
-            ("sin(z)", "cmath.sin("),
-            ("cos(z)", "cmath.cos("),
-            ("tan(z)", "cmath.tan("),
-            ("phase(z)", "cmath.phase("),
-            ("polar(z)", "cmath.polar("),
-            ("rect(r, phi)", "cmath.rect("),
-        ]
-        for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
-
-    def setup_decimal_menu(self, menubar):
-        """Setup the Decimal menu"""
-        decimal_menu = menubar.addMenu("Decimal")
-        decimal_functions = [
-            ("Decimal('0.1')", "decimal.Decimal('"),
-            ("getcontext()", "decimal.getcontext()"),
-            ("setcontext(ctx)", "decimal.setcontext("),
-            ("localcontext()", "decimal.localcontext()"),
-        ]
-        for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
-
-    def setup_fractions_menu(self, menubar):
-        """Setup the Fractions menu"""
-        fractions_menu = menubar.addMenu("Fractions")
-        fractions_functions = [
-            ("Fraction(1, 3)", "fractions.Fraction("),
-            ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
-            ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
-            ("gcd(a, b)", "fractions.gcd("),
-        ]
-        for name, func in fractions_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
-
-    def setup_constants_menu(self, menubar):
-        """Setup the Constants menu"""
-        constants_menu = menubar.addMenu("Constants")
-        # Mathematical constants
-        math_constants = [
-            ("π (pi)", "math.pi"),
-            ("e (Euler's number)", "math.e"),
-            ("τ (tau = 2π)", "math.tau"),
-            ("∞ (infinity)", "math.inf"),
-            ("NaN", "math.nan"),
-        ]
-        for name, const in math_constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
-        # NumPy constants
-        if 'np' in self.base_namespace:
-            constants_menu.addSeparator()
-            numpy_constants = [
-                ("np.pi", "np.pi"),
-                ("np.e", "np.e"),
-                ("np.inf", "np.inf"),
-                ("np.nan", "np.nan"),
-            ]
-            for name, const in numpy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-        # SymPy constants
-        if 'sym' in self.base_namespace:
-            constants_menu.addSeparator()
-            sympy_constants = [
-                ("sym.pi", "sym.pi"),
-                ("sym.E", "sym.E"),
-                ("sym.I (imaginary unit)", "sym.I"),
-                ("sym.oo (infinity)", "sym.oo"),
-                ("sym.zoo (complex infinity)", "sym.zoo"),
-            ]
-            for name, const in sympy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-
-    def setup_toolbar(self):
-        """Setup the toolbar with quick actions"""
-        toolbar = QToolBar()
-        self.addToolBar(toolbar)
-        
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
-        
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
-        
-    def setup_math_menu(self, menubar):
-        """Setup the Math Functions menu"""
-        math_menu = menubar.addMenu("Math")
-        
-        # Trigonometric functions
-        trig_menu = math_menu.addMenu("Trigonometric")
-        trig_functions = [
-            ("sin(x)", "math.sin("),
-            ("cos(x)", "math.cos("),
-            ("tan(x)", "math.tan("),
-            ("asin(x)", "math.asin("),
-            ("acos(x)", "math.acos("),
-            ("atan(x)", "math.atan("),
-            ("atan2(y,x)", "math.atan2("),
-            ("sinh(x)", "math.sinh("),
-            ("cosh(x)", "math.cosh("),
-            ("tanh(x)", "math.tanh("),
-            ("asinh(x)", "math.asinh("),
-            ("acosh(x)", "math.acosh("),
-            ("atanh(x)", "math.atanh("),
-        ]
-        for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
-        
-        # Logarithmic and exponential
-        log_menu = math_menu.addMenu("Logarithmic & Exponential")
-        log_functions = [
-            ("exp(x)", "math.exp("),
-            ("log(x)", "math.log("),
-            ("log10(x)", "math.log10("),
-            ("log2(x)", "math.log2("),
-            ("log(x, base)", "math.log("),
-            ("pow(x, y)", "math.pow("),
-            ("sqrt(x)", "math.sqrt("),
-        ]
-        for name, func in log_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            log_menu.addAction(action)
-        
-        # Number theory and utilities
-        util_menu = math_menu.addMenu("Number Theory & Utilities")
-        util_functions = [
-            ("abs(x)", "abs("),
-            ("ceil(x)", "math.ceil("),
-            ("floor(x)", "math.floor("),
-            ("round(x)", "round("),
-            ("trunc(x)", "math.trunc("),
-            ("fabs(x)", "math.fabs("),
-            ("gcd(a, b)", "math.gcd("),
-            ("lcm(a, b)", "math.lcm("),
-            ("factorial(x)", "math.factorial("),
-            ("comb(n, k)", "math.comb("),
-            ("perm(n, k)", "math.perm("),
-        ]
-        for name, func in util_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            util_menu.addAction(action)
-        
-        # Special functions
-        special_menu = math_menu.addMenu("Special Functions")
-        special_functions = [
-            ("gamma(x)", "math.gamma("),
-            ("lgamma(x)", "math.lgamma("),
-            ("erf(x)", "math.erf("),
-            ("erfc(x)", "math.erfc("),
-            ("degrees(x)", "math.degrees("),
-            ("radians(x)", "math.radians("),
-        ]
-        for name, func in special_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            special_menu.addAction(action)
-    
-    def setup_random_menu(self, menubar):
-        """Setup the Random menu"""
-        random_menu = menubar.addMenu("Random")
-        random_functions = [
-            ("random()", "random.random()"),
-            ("randint(a, b)", "random.randint("),
-            ("uniform(a, b)", "random.uniform("),
-            ("choice(seq)", "random.choice("),
-            ("shuffle(seq)", "random.shuffle("),
-            ("sample(seq, k)", "random.sample("),
-            ("seed(n)", "random.seed("),
-        ]
-        for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
-
-    def setup_statistics_menu(self, menubar):
-        """Setup the Statistics menu"""
-        stats_menu = menubar.addMenu("Statistics")
-        stats_functions = [
-            ("mean(data)", "statistics.mean("),
-            ("median(data)", "statistics.median("),
-            ("mode(data)", "statistics.mode("),
-            ("stdev(data)", "statistics.stdev("),
-            ("variance(data)", "statistics.variance("),
-            ("harmonic_mean(data)", "statistics.harmonic_mean("),
-            ("multimode(data)", "statistics.multimode("),
-        ]
-        for name, func in stats_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
-
-    def setup_cmath_menu(self, menubar):
-        """Setup the Complex Math menu"""
-        cmath_menu = menubar.addMenu("Complex Math (cmath)")
-        cmath_functions = [
-            ("sqrt(z)", "cmath.sqrt("),
-            ("exp(z)", "cmath.exp("),
-            ("log(z)", "cmath.log("),
-            ("sin(z)", "cmath.sin("),
-            ("cos(z)", "cmath.cos("),
-            ("tan(z)", "cmath.tan("),
-            ("phase(z)", "cmath.phase("),
-            ("polar(z)", "cmath.polar("),
-            ("rect(r, phi)", "cmath.rect("),
-        ]
-        for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
-
-    def setup_decimal_menu(self, menubar):
-        """Setup the Decimal menu"""
-        decimal_menu = menubar.addMenu("Decimal")
-        decimal_functions = [
-            ("Decimal('0.1')", "decimal.Decimal('"),
-            ("getcontext()", "decimal.getcontext()"),
-            ("setcontext(ctx)", "decimal.setcontext("),
-            ("localcontext()", "decimal.localcontext()"),
-        ]
-        for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
-
-    def setup_fractions_menu(self, menubar):
-        """Setup the Fractions menu"""
-        fractions_menu = menubar.addMenu("Fractions")
-        fractions_functions = [
-            ("Fraction(1, 3)", "fractions.Fraction("),
-            ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
-            ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
-            ("gcd(a, b)", "fractions.gcd("),
-        ]
-        for name, func in fractions_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
-
-    def setup_constants_menu(self, menubar):
-        """Setup the Constants menu"""
-        constants_menu = menubar.addMenu("Constants")
-        # Mathematical constants
-        math_constants = [
-            ("π (pi)", "math.pi"),
-            ("e (Euler's number)", "math.e"),
-            ("τ (tau = 2π)", "math.tau"),
-            ("∞ (infinity)", "math.inf"),
-            ("NaN", "math.nan"),
-        ]
-        for name, const in math_constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
-        # NumPy constants
-        if 'np' in self.base_namespace:
-            constants_menu.addSeparator()
-            numpy_constants = [
-                ("np.pi", "np.pi"),
-                ("np.e", "np.e"),
-                ("np.inf", "np.inf"),
-                ("np.nan", "np.nan"),
-            ]
-            for name, const in numpy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-        # SymPy constants
-        if 'sym' in self.base_namespace:
-            constants_menu.addSeparator()
-            sympy_constants = [
-                ("sym.pi", "sym.pi"),
-                ("sym.E", "sym.E"),
-                ("sym.I (imaginary unit)", "sym.I"),
-                ("sym.oo (infinity)", "sym.oo"),
-                ("sym.zoo (complex infinity)", "sym.zoo"),
-            ]
-            for name, const in sympy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-
+    
     def setup_toolbar(self):
         """Setup the toolbar with quick actions"""
         toolbar = QToolBar()
         self.addToolBar(toolbar)
         
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
-        
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
-        
-    def setup_math_menu(self, menubar):
-        """Setup the Math Functions menu"""
-        math_menu = menubar.addMenu("Math")
-        
-        # Trigonometric functions
-        trig_menu = math_menu.addMenu("Trigonometric")
-        trig_functions = [
-            ("sin(x)", "math.sin("),
-            ("cos(x)", "math.cos("),
-            ("tan(x)", "math.tan("),
-            ("asin(x)", "math.asin("),
-            ("acos(x)", "math.acos("),
-            ("atan(x)", "math.atan("),
-            ("atan2(y,x)", "math.atan2("),
-            ("sinh(x)", "math.sinh("),
-            ("cosh(x)", "math.cosh("),
-            ("tanh(x)", "math.tanh("),
-            ("asinh(x)", "math.asinh("),
-            ("acosh(x)", "math.acosh("),
-            ("atanh(x)", "math.atanh("),
-        ]
-        for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
-        
-        # Logarithmic and exponential
-        log_menu = math_menu.addMenu("Logarithmic & Exponential")
-        log_functions = [
-            ("exp(x)", "math.exp("),
-            ("log(x)", "math.log("),
-            ("log10(x)", "math.log10("),
-            ("log2(x)", "math.log2("),
-            ("log(x, base)", "math.log("),
-            ("pow(x, y)", "math.pow("),
-            ("sqrt(x)", "math.sqrt("),
-        ]
-        for name, func in log_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            log_menu.addAction(action)
-        
-        # Number theory and utilities
-        util_menu = math_menu.addMenu("Number Theory & Utilities")
-        util_functions = [
-            ("abs(x)", "abs("),
-            ("ceil(x)", "math.ceil("),
-            ("floor(x)", "math.floor("),
-            ("round(x)", "round("),
-            ("trunc(x)", "math.trunc("),
-            ("fabs(x)", "math.fabs("),
-            ("gcd(a, b)", "math.gcd("),
-            ("lcm(a, b)", "math.lcm("),
-            ("factorial(x)", "math.factorial("),
-            ("comb(n, k)", "math.comb("),
-            ("perm(n, k)", "math.perm("),
-        ]
-        for name, func in util_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            util_menu.addAction(action)
-        
-        # Special functions
-        special_menu = math_menu.addMenu("Special Functions")
-        special_functions = [
-            ("gamma(x)", "math.gamma("),
-            ("lgamma(x)", "math.lgamma("),
-            ("erf(x)", "math.erf("),
-            ("erfc(x)", "math.erfc("),
-            ("degrees(x)", "math.degrees("),
-            ("radians(x)", "math.radians("),
-        ]
-        for name, func in special_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            special_menu.addAction(action)
-    
-    def setup_random_menu(self, menubar):
-        """Setup the Random menu"""
-        random_menu = menubar.addMenu("Random")
-        random_functions = [
-            ("random()", "random.random()"),
-            ("randint(a, b)", "random.randint("),
-            ("uniform(a, b)", "random.uniform("),
-            ("choice(seq)", "random.choice("),
-            ("shuffle(seq)", "random.shuffle("),
-            ("sample(seq, k)", "random.sample("),
-            ("seed(n)", "random.seed("),
-        ]
-        for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
-
-    def setup_statistics_menu(self, menubar):
-        """Setup the Statistics menu"""
-        stats_menu = menubar.addMenu("Statistics")
-        stats_functions = [
-            ("mean(data)", "statistics.mean("),
-            ("median(data)", "statistics.median("),
-            ("mode(data)", "statistics.mode("),
-            ("stdev(data)", "statistics.stdev("),
-            ("variance(data)", "statistics.variance("),
-            ("harmonic_mean(data)", "statistics.harmonic_mean("),
-            ("multimode(data)", "statistics.multimode("),
-        ]
-        for name, func in stats_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
-
-    def setup_cmath_menu(self, menubar):
-        """Setup the Complex Math menu"""
-        cmath_menu = menubar.addMenu("Complex Math (cmath)")
-        cmath_functions = [
-            ("sqrt(z)", "cmath.sqrt("),
-            ("exp(z)", "cmath.exp("),
-            ("log(z)", "cmath.log("),
-            ("sin(z)", "cmath.sin("),
-            ("cos(z)", "cmath.cos("),
-            ("tan(z)", "cmath.tan("),
-            ("phase(z)", "cmath.phase("),
-            ("polar(z)", "cmath.polar("),
-            ("rect(r, phi)", "cmath.rect("),
-        ]
-        for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
-
-    def setup_decimal_menu(self, menubar):
-        """Setup the Decimal menu"""
-        decimal_menu = menubar.addMenu("Decimal")
-        decimal_functions = [
-            ("Decimal('0.1')", "decimal.Decimal('"),
-            ("getcontext()", "decimal.getcontext()"),
-            ("setcontext(ctx)", "decimal.setcontext("),
-            ("localcontext()", "decimal.localcontext()"),
-        ]
-        for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
-
-    def setup_fractions_menu(self, menubar):
-        """Setup the Fractions menu"""
-        fractions_menu = menubar.addMenu("Fractions")
-        fractions_functions = [
-            ("Fraction(1, 3)", "fractions.Fraction("),
-            ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
-            ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
-            ("gcd(a, b)", "fractions.gcd("),
-        ]
-        for name, func in fractions_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
-
-    def setup_constants_menu(self, menubar):
-        """Setup the Constants menu"""
-        constants_menu = menubar.addMenu("Constants")
-        # Mathematical constants
-        math_constants = [
-            ("π (pi)", "math.pi"),
-            ("e (Euler's number)", "math.e"),
-            ("τ (tau = 2π)", "math.tau"),
-            ("∞ (infinity)", "math.inf"),
-            ("NaN", "math.nan"),
-        ]
-        for name, const in math_constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
-        # NumPy constants
-        if 'np' in self.base_namespace:
-            constants_menu.addSeparator()
-            numpy_constants = [
-                ("np.pi", "np.pi"),
-                ("np.e", "np.e"),
-                ("np.inf", "np.inf"),
-                ("np.nan", "np.nan"),
-            ]
-            for name, const in numpy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-        # SymPy constants
-        if 'sym' in self.base_namespace:
-            constants_menu.addSeparator()
-            sympy_constants = [
-                ("sym.pi", "sym.pi"),
-                ("sym.E", "sym.E"),
-                ("sym.I (imaginary unit)", "sym.I"),
-                ("sym.oo (infinity)", "sym.oo"),
-                ("sym.zoo (complex infinity)", "sym.zoo"),
-            ]
-            for name, const in sympy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-
-    def setup_toolbar(self):
-        """Setup the toolbar with quick actions"""
-        toolbar = QToolBar()
-        self.addToolBar(toolbar)
+        # Quick function buttons, drawn by the toolbar itself
+        self.add_insert_actions(toolbar, TOOLBAR_FUNCTIONS)
+    
+    def add_insert_actions(self, widget, entries):
+        """Add an action to a menu or toolbar for each (name, text) pair that
+        inserts the text into the current editor"""
+        # The text rides along as action data so every action shares one
+        # bound slot instead of owning a lambda; the slot and addAction are
+        # looked up once per table rather than once per entry
+        add_action = widget.addAction
+        slot = self.on_insert_action_triggered
+        for name, text in entries:
+            action = add_action(name)
+            action.setData(text)
+            action.triggered.connect(slot)
+    
+    def add_insert_menu(self, parent, title, *tables):
+        """Add a submenu of insert actions, one section per table.
+        
+        The actions are only created the first time the menu is shown, so
+        menus that are never opened cost no QActions at startup.
+        """
+        menu = parent.addMenu(title)
         
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
+        def populate():
+            menu.aboutToShow.disconnect(populate)
+            for index, entries in enumerate(tables):
+                if index:
+                    menu.addSeparator()
+                self.add_insert_actions(menu, entries)
         
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
+        menu.aboutToShow.connect(populate)
+        return menu
+    
+    @Slot()
+    def on_insert_action_triggered(self):
+        """Insert the text of the action that was triggered"""
+        self.insert_function(self.sender().data())
         
-    def setup_math_menu(self, menubar):
-        """Setup the Math Functions menu"""
+    def setup_insert_menus(self, menubar):
+        """Setup the menus that insert functions and constants"""
         math_menu = menubar.addMenu("Math")
+        for title, entries in MATH_SUBMENUS:
+            self.add_insert_menu(math_menu, title, entries)
+        for title, entries in INSERT_MENUS:
+            self.add_insert_menu(menubar, title, entries)
         
-        # Trigonometric functions
-        trig_menu = math_menu.addMenu("Trigonometric")
-        trig_functions = [
-            ("sin(x)", "math.sin("),
-            ("cos(x)", "math.cos("),
-            ("tan(x)", "math.tan("),
-            ("asin(x)", "math.asin("),
-            ("acos(x)", "math.acos("),
-            ("atan(x)", "math.atan("),
-            ("atan2(y,x)", "math.atan2("),
-            ("sinh(x)", "math.sinh("),
-            ("cosh(x)", "math.cosh("),
-            ("tanh(x)", "math.tanh("),
-            ("asinh(x)", "math.asinh("),
-            ("acosh(x)", "math.acosh("),
-            ("atanh(x)", "math.atanh("),
-        ]
-        for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
-        
-        # Logarithmic and exponential
-        log_menu = math_menu.addMenu("Logarithmic & Exponential")
-        log_functions = [
-            ("exp(x)", "math.exp("),
-            ("log(x)", "math.log("),
-            ("log10(x)", "math.log10("),
-            ("log2(x)", "math.log2("),
-            ("log(x, base)", "math.log("),
-            ("pow(x, y)", "math.pow("),
-            ("sqrt(x)", "math.sqrt("),
-        ]
-        for name, func in log_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            log_menu.addAction(action)
-        
-        # Number theory and utilities
-        util_menu = math_menu.addMenu("Number Theory & Utilities")
-        util_functions = [
-            ("abs(x)", "abs("),
-            ("ceil(x)", "math.ceil("),
-            ("floor(x)", "math.floor("),
-            ("round(x)", "round("),
-            ("trunc(x)", "math.trunc("),
-            ("fabs(x)", "math.fabs("),
-            ("gcd(a, b)", "math.gcd("),
-            ("lcm(a, b)", "math.lcm("),
-            ("factorial(x)", "math.factorial("),
-            ("comb(n, k)", "math.comb("),
-            ("perm(n, k)", "math.perm("),
-        ]
-        for name, func in util_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            util_menu.addAction(action)
-        
-        # Special functions
-        special_menu = math_menu.addMenu("Special Functions")
-        special_functions = [
-            ("gamma(x)", "math.gamma("),
-            ("lgamma(x)", "math.lgamma("),
-            ("erf(x)", "math.erf("),
-            ("erfc(x)", "math.erfc("),
-            ("degrees(x)", "math.degrees("),
-            ("radians(x)", "math.radians("),
-        ]
-        for name, func in special_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            special_menu.addAction(action)
-    
-    def setup_random_menu(self, menubar):
-        """Setup the Random menu"""
-        random_menu = menubar.addMenu("Random")
-        random_functions = [
-            ("random()", "random.random()"),
-            ("randint(a, b)", "random.randint("),
-            ("uniform(a, b)", "random.uniform("),
-            ("choice(seq)", "random.choice("),
-            ("shuffle(seq)", "random.shuffle("),
-            ("sample(seq, k)", "random.sample("),
-            ("seed(n)", "random.seed("),
-        ]
-        for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
-
-    def setup_statistics_menu(self, menubar):
-        """Setup the Statistics menu"""
-        stats_menu = menubar.addMenu("Statistics")
-        stats_functions = [
-            ("mean(data)", "statistics.mean("),
-            ("median(data)", "statistics.median("),
-            ("mode(data)", "statistics.mode("),
-            ("stdev(data)", "statistics.stdev("),
-            ("variance(data)", "statistics.variance("),
-            ("harmonic_mean(data)", "statistics.harmonic_mean("),
-            ("multimode(data)", "statistics.multimode("),
-        ]
-        for name, func in stats_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
-
-    def setup_cmath_menu(self, menubar):
-        """Setup the Complex Math menu"""
-        cmath_menu = menubar.addMenu("Complex Math (cmath)")
-        cmath_functions = [
-            ("sqrt(z)", "cmath.sqrt("),
-            ("exp(z)", "cmath.exp("),
-            ("log(z)", "cmath.log("),
-            ("sin(z)", "cmath.sin("),
-            ("cos(z)", "cmath.cos("),
-            ("tan(z)", "cmath.tan("),
-            ("phase(z)", "cmath.phase("),
-            ("polar(z)", "cmath.polar("),
-            ("rect(r, phi)", "cmath.rect("),
-        ]
-        for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
-
-    def setup_decimal_menu(self, menubar):
-        """Setup the Decimal menu"""
-        decimal_menu = menubar.addMenu("Decimal")
-        decimal_functions = [
-            ("Decimal('0.1')", "decimal.Decimal('"),
-            ("getcontext()", "decimal.getcontext()"),
-            ("setcontext(ctx)", "decimal.setcontext("),
-            ("localcontext()", "decimal.localcontext()"),
-        ]
-        for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
-
-    def setup_fractions_menu(self, menubar):
-        """Setup the Fractions menu"""
-        fractions_menu = menubar.addMenu("Fractions")
-        fractions_functions = [
-            ("Fraction(1, 3)", "fractions.Fraction("),
-            ("Fraction.from_float(0.5)", "fractions.Fraction.from_float("),
-            ("Fraction.from_decimal(d)", "fractions.Fraction.from_decimal("),
-            ("gcd(a, b)", "fractions.gcd("),
-        ]
-        for name, func in fractions_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
-
-    def setup_constants_menu(self, menubar):
-        """Setup the Constants menu"""
-        constants_menu = menubar.addMenu("Constants")
-        # Mathematical constants
-        math_constants = [
-            ("π (pi)", "math.pi"),
-            ("e (Euler's number)", "math.e"),
-            ("τ (tau = 2π)", "math.tau"),
-            ("∞ (infinity)", "math.inf"),
-            ("NaN", "math.nan"),
-        ]
-        for name, const in math_constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
-        # NumPy constants
-        if 'np' in self.base_namespace:
-            constants_menu.addSeparator()
-            numpy_constants = [
-                ("np.pi", "np.pi"),
-                ("np.e", "np.e"),
-                ("np.inf", "np.inf"),
-                ("np.nan", "np.nan"),
-            ]
-            for name, const in numpy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
-        # SymPy constants
-        if 'sym' in self.base_namespace:
-            constants_menu.addSeparator()
-            sympy_constants = [
-                ("sym.pi", "sym.pi"),
-                ("sym.E", "sym.E"),
-                ("sym.I (imaginary unit)", "sym.I"),
-                ("sym.oo (infinity)", "sym.oo"),
-                ("sym.zoo (complex infinity)", "sym.zoo"),
-            ]
-            for name, const in sympy_constants:
-                action = QAction(name, self)
-                action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-                constants_menu.addAction(action)
+        # Mathematical constants, then NumPy and SymPy ones when available
+        tables = [MATH_CONSTANTS]
+        if NUMPY_AVAILABLE:
+            tables.append(NUMPY_CONSTANTS)
+        if SYMPY_AVAILABLE:
+            tables.append(SYMPY_CONSTANTS)
+        self.add_insert_menu(menubar, "Constants", *tables)
 
-    def setup_toolbar(self):
-        """Setup the toolbar with quick actions"""
-        toolbar = QToolBar()
-        self.addToolBar(toolbar)
-        
-        # Quick function buttons
-        functions = [
-            ("π", "math.pi"),
-            ("e", "math.e"),
-            ("sin", "math.sin("),
-            ("cos", "math.cos("),
-            ("tan", "math.tan("),
-            ("√", "math.sqrt("),
-            ("log", "math.log("),
-            ("ln", "math.log("),
-            ("x²", "**2"),
-            ("x^y", "**")
-        ]
-        
-        for name, func in functions:
-            btn = QPushButton(name)
-            btn.clicked.connect(lambda checked, f=func: self.insert_function(f))
-            toolbar.addWidget(btn)
-        
     def new_document(self):
         """Create a new document tab"""
         tab_count = self.tab_widget.count()
@@ -2291,14 +1495,16 @@ class ScientificCalculator(QMainWindow):
         dialog = ThemeCustomizer(self)
         dialog.exec()
     
+    @cached_property
+    def panel_config_manager(self):
+        """Panel configuration manager, created on first use"""
+        from panel_config_manager import PanelConfigManager
+        return PanelConfigManager()
+    
     def open_panel_layout_config(self):
         """Open panel layout configuration dialog"""
         try:
-            from panel_config_manager import PanelConfigManager, PanelLayoutDialog
-            
-            # Initialize config manager if not exists
-            if not hasattr(self, 'panel_config_manager'):
-                self.panel_config_manager = PanelConfigManager()
+            from panel_config_manager import PanelLayoutDialog
             
             # Create and show dialog
             layout_dialog = PanelLayoutDialog(self, self.panel_config_manager)
@@ -2314,16 +1520,17 @@ class ScientificCalculator(QMainWindow):
     def reload_panel_layout(self):
         """Reload panel layout based on configuration"""
         try:
-            if not hasattr(self, 'panel_config_manager'):
-                from panel_config_manager import PanelConfigManager
-                self.panel_config_manager = PanelConfigManager()
-            
             layout = self.panel_config_manager.get_panel_layout()
             self.apply_panel_layout(layout)
             
         except Exception as e:
             print(f"Error reloading panel layout: {e}")
     
+    def panel_dock(self, panel_name):
+        """Return the dock widget of a configured panel, or None"""
+        attr = PANEL_DOCKS.get(panel_name)
+        return getattr(self, attr, None) if attr else None
+    
     def apply_panel_layout(self, layout):
         """Apply a panel layout configuration"""
         # This is a simplified version - you can expand this based on your needs
@@ -2333,33 +1540,19 @@ class ScientificCalculator(QMainWindow):
             
             if panel_name and visible:
                 # Show/hide panels based on configuration
-                if panel_name == "history" and hasattr(self, 'history_dock'):
-                    self.history_dock.setVisible(True)
-                elif panel_name == "functions" and hasattr(self, 'functions_dock'):
-                    self.functions_dock.setVisible(True)
-                elif panel_name == "graph" and hasattr(self, 'graph_dock'):
-                    self.graph_dock.setVisible(True)
-                elif panel_name == "variables" and hasattr(self, 'variables_dock'):
-                    self.variables_dock.setVisible(True)
+                dock = self.panel_dock(panel_name)
+                if dock:
+                    dock.setVisible(True)
     
     def apply_panel_styling(self, panel_name):
         """Apply styling to a specific panel"""
         try:
-            if not hasattr(self, 'panel_config_manager'):
-                from panel_config_manager import PanelConfigManager
-                self.panel_config_manager = PanelConfigManager()
-            
             stylesheet = self.panel_config_manager.generate_qt_stylesheet(panel_name)
             
             # Apply stylesheet to appropriate dock widget
-            if panel_name == "history" and hasattr(self, 'history_dock'):
-                self.history_dock.setStyleSheet(stylesheet)
-            elif panel_name == "functions" and hasattr(self, 'functions_dock'):
-                self.functions_dock.setStyleSheet(stylesheet)
-            elif panel_name == "graph" and hasattr(self, 'graph_dock'):
-                self.graph_dock.setStyleSheet(stylesheet)
-            elif panel_name == "variables" and hasattr(self, 'variables_dock'):
-                self.variables_dock.setStyleSheet(stylesheet)
+            dock = self.panel_dock(panel_name)
+            if dock:
+                dock.setStyleSheet(stylesheet)
                 
         except Exception as e:
             print(f"Error applying panel styling for {panel_name}: {e}")
@@ -2367,9 +1560,6 @@ class ScientificCalculator(QMainWindow):
     def load_panel_configuration(self):
         """Load and apply panel configuration on startup"""
         try:
-            from panel_config_manager import PanelConfigManager
-            self.panel_config_manager = PanelConfigManager()
-            
             # Apply layout
             layout = self.panel_config_manager.get_panel_layout()
             self.apply_panel_layout(layout)
@@ -2429,7 +1619,7 @@ class ScientificCalculator(QMainWindow):
         """Clear all variables"""
         self.variables.clear()
         self.namespace = self.base_namespace.copy()
-        self.variables_widget.update_variables({})
+        self.update_variables_display()
         # Clear line results and recalculate
         editor = self.get_current_editor()
         if editor:
@@ -2439,7 +1629,7 @@ class ScientificCalculator(QMainWindow):
         """Edit a variable value"""
         try:
             # Try to evaluate the new value
-            new_value = eval(new_value_str, {"__builtins__": {}}, self.base_namespace)
+            new_value = eval(new_value_str, _EVAL_GLOBALS, self.base_namespace)
             self.variables[var_name] = new_value
             self.namespace[var_name] = new_value
             self.recalculate_all()
@@ -2466,29 +1656,17 @@ class ScientificCalculator(QMainWindow):
             # Apply styling
             self.apply_styling()
             
+            # Apply custom styling
+            self.set_editor_style_sheet(colors['bg'].name(), colors['text'].name(), "#3c3c3c", "#264f78")
+            
             # Update all editors
             for i in range(self.tab_widget.count()):
                 widget = self.tab_widget.widget(i)
                 if widget and hasattr(widget, 'editor'):
-                    editor = widget.editor
-                    editor.setFont(self.text_font)
-                    
-                    # Apply custom styling
-                    editor.setStyleSheet(f"""
-                        QPlainTextEdit {{
-                            background-color: {colors['bg'].name()};
-                            color: {colors['text'].name()};
-                            border: 1px solid #3c3c3c;
-                            line-height: 1.4;
-                            padding: 10px;
-                            selection-background-color: #264f78;
-                            selection-color: white;
-                        }}
-                    """)
-                    
                     # Update highlighter with custom colors
                     if hasattr(widget, 'highlighter'):
                         widget.highlighter.setup_custom_theme(colors)
+                        widget.highlighter_theme = "custom"
         except Exception as e:
             print(f"Error applying custom theme: {e}")
             QMessageBox.warning(self, "Theme Error", f"Failed to apply theme: {e}")
@@ -2496,13 +1674,14 @@ class ScientificCalculator(QMainWindow):
     def on_text_changed(self, editor):
         """Handle text changes in a specific editor"""
         # Use a timer to avoid recalculating on every keystroke
-        if hasattr(self, 'calculation_timer') and self.calculation_timer:
-            self.calculation_timer.stop()
-        
-        self.calculation_timer = QTimer()
-        self.calculation_timer.setSingleShot(True)
-        self.calculation_timer.timeout.connect(lambda: self.recalculate_changed_lines(editor))
-        self.calculation_timer.start(500)  # Wait 500ms after last keystroke
+        self.pending_calculation_editor = editor
+        self.calculation_timer.start()
+    
+    def run_pending_calculation(self):
+        """Recalculate the editor whose text changed, once typing pauses"""
+        editor, self.pending_calculation_editor = self.pending_calculation_editor, None
+        if editor is not None:
+            self.recalculate_changed_lines(editor)
     
     def on_cursor_changed(self, editor):
         """Handle cursor position changes in a specific editor"""
@@ -2515,85 +1694,93 @@ class ScientificCalculator(QMainWindow):
         if editor is None:
             editor = self.get_current_editor()
         if editor:
+            # Run even when the text is the one calculated last
+            self.last_calculation = None
             self.recalculate_changed_lines(editor)
     
     def recalculate_changed_lines(self, editor):
         """Recalculate lines that have changed for a specific editor"""
-        # Reset namespace to the predefined safe defaults before recalculation
+        current_text = editor.toPlainText()
+        if self.last_calculation == (editor, current_text):
+            # Typing that ends where it started (or an edit undone before
+            # the timer fired) leaves the last results in place
+            return
+        
+        # Reset namespace to the predefined safe defaults before recalculation.
+        # Every statement that sets a variable also writes it here, so the
+        # namespace is not merged with all variables before each statement.
+        # It stays a real dict because multi-line blocks run with it as their
+        # globals, where functions they define keep finding later variables.
         self.namespace = self.base_namespace.copy()
         
-        current_text = editor.toPlainText()
         lines = current_text.split('\n')
         
         # Clear variables and recalculate from top
         self.variables.clear()
         self.line_results.clear()
         
-        results_lines = []
-        
         # Process lines to handle multi-line statements
         processed_lines = self.process_multiline_statements(lines)
         
+        # Every statement runs again in the fresh namespace: values can be
+        # mutated in place and functions read globals when called, so results
+        # of an earlier pass cannot be told apart from stale ones by the text
+        calculations = []  # For the history, added in one go
         for item in processed_lines:
             line_num = item['line_num']
             code_block = item['code']
             is_multiline = item['is_multiline']
             
             if not code_block.strip() or code_block.strip().startswith('#'):
-                results_lines.append("")
                 continue
                 
             try:
-                # Update namespace with current variables
-                self.namespace.update(self.variables)
-                
                 if is_multiline:
                     # Execute multi-line code block
                     result = self.execute_multiline_code(code_block)
                     if result is not None:
                         formatted_result = self.format_result(result)
                         self.line_results[line_num] = formatted_result
-                        results_lines.append(f"= {formatted_result}")
                         
                         # Add to history
-                        self.history_widget.add_calculation(code_block, formatted_result)
+                        calculations.append((code_block, formatted_result))
                     else:
                         self.line_results[line_num] = "executed"
-                        results_lines.append("✓ executed")
                 else:
                     # Handle single line as before
-                    if '=' in code_block and not any(op in code_block.split('=')[0] for op in ['==', '!=', '<=', '>=']):
+                    assignment = _parse_assignment(code_block)
+                    if assignment is not None:
                         # Variable assignment
-                        var_name = code_block.split('=')[0].strip()
-                        var_expression = code_block.split('=', 1)[1].strip()
+                        var_names, var_expression = assignment
                         
                         # Evaluate the right side
-                        result = eval(var_expression, {"__builtins__": {}}, self.namespace)
-                        self.variables[var_name] = result
-                        self.namespace[var_name] = result
+                        result = eval(_compile_code(var_expression, '<string>', 'eval'), _EVAL_GLOBALS, self.namespace)
+                        for var_name in var_names:
+                            self.variables[var_name] = result
+                            self.namespace[var_name] = result
                         
                         # Format and store result
                         formatted_result = self.format_result(result)
-                        self.line_results[line_num] = f"{var_name} = {formatted_result}"
-                        results_lines.append(f"= {formatted_result}")
+                        self.line_results[line_num] = f"{' = '.join(var_names)} = {formatted_result}"
                         
                         # Add to history
-                        self.history_widget.add_calculation(code_block, formatted_result)
+                        calculations.append((code_block, formatted_result))
                         
                     else:
                         # Regular expression evaluation
-                        result = eval(code_block, {"__builtins__": {}}, self.namespace)
+                        result = eval(_compile_code(code_block, '<string>', 'eval'), _EVAL_GLOBALS, self.namespace)
                         formatted_result = self.format_result(result)
                         self.line_results[line_num] = formatted_result
-                        results_lines.append(f"= {formatted_result}")
                         
                         # Add to history
-                        self.history_widget.add_calculation(code_block, formatted_result)
+                        calculations.append((code_block, formatted_result))
                         
             except Exception as e:
                 error_msg = f"Error: {str(e)}"
                 self.line_results[line_num] = error_msg
-                results_lines.append(f"❌ {str(e)}")
+        
+        self.last_calculation = (editor, current_text)
+        self.history_widget.add_calculations(calculations)
         
         # Update inline results in code editor
         self.update_inline_results(editor)
@@ -2601,76 +1788,49 @@ class ScientificCalculator(QMainWindow):
     
     def update_inline_results(self, editor):
         """Update inline results in the specified code editor"""
-        # Clear existing line results
-        editor.clear_line_results()
-        
-        # Set results for each line
-        for line_num, result in self.line_results.items():
-            editor.set_line_result(line_num + 1, result)  # line_num is 0-based, display is 1-based
+        # line_num is 0-based, display is 1-based
+        editor.set_line_results({
+            line_num + 1: result for line_num, result in self.line_results.items()
+        })
     
     def update_variables_display(self):
         """Update the variables display in the variable inspector"""
-        self.variables_widget.update_variables(self.variables)
+        if self.variables_widget is not None:
+            self.variables_widget.update_variables(self.variables)
     
     def process_multiline_statements(self, lines):
-        """Process lines to handle multi-line statements"""
+        """Process lines to handle multi-line statements.
+        
+        A compound statement runs from its header line over every following
+        line that is indented, blank, a comment or a continuation clause
+        (elif, else, except, finally), all in one pass over the lines.
+        """
         processed = []
-        current_block = ""
+        block_lines = None
         block_start = 0
-        indent_level = 0
         
         for i, line in enumerate(lines):
             stripped = line.strip()
             
-            # Skip empty lines and comments
-            if not stripped or stripped.startswith('#'):
-                if current_block:
-                    current_block += line + "\n"
-                else:
-                    processed.append({
-                        'line_num': i,
-                        'code': line,
-                        'is_multiline': False
-                    })
-                continue
+            if block_lines is not None:
+                if (not stripped or stripped.startswith('#') or line[0] in ' \t' or
+                        stripped.startswith(CLAUSE_KEYWORDS)):
+                    block_lines.append(line)
+                    continue
+                processed.append({
+                    'line_num': block_start,
+                    'code': '\n'.join(block_lines).strip(),
+                    'is_multiline': True
+                })
+                block_lines = None
             
-            # Check for multi-line indicators
-            if (stripped.endswith(':') or 
-                any(stripped.startswith(kw) for kw in ['def ', 'class ', 'if ', 'for ', 'while ', 'try:', 'except', 'finally:', 'with ', 'elif ', 'else:']) or
-                indent_level > 0):
-                
-                if not current_block:
-                    block_start = i
-                current_block += line + "\n"
-                
-                # Update indent level
-                if stripped.endswith(':'):
-                    indent_level += 1
-                elif line.startswith('    ') or line.startswith('\t'):
-                    pass  # Keep current indent level
-                else:
-                    indent_level = max(0, indent_level - 1)
-                
-                # If we're back to base level, end the block
-                if indent_level == 0 and not stripped.endswith(':'):
-                    processed.append({
-                        'line_num': block_start,
-                        'code': current_block.strip(),
-                        'is_multiline': True
-                    })
-                    current_block = ""
+            if stripped and not stripped.startswith('#') and (
+                    stripped.endswith(':') or stripped.startswith(BLOCK_KEYWORDS) or
+                    ('#' in stripped and _ends_with_colon_before_comment(stripped))):
+                block_start = i
+                block_lines = [line]
             else:
-                # Single line statement
-                if current_block:
-                    # Finish previous block first
-                    processed.append({
-                        'line_num': block_start,
-                        'code': current_block.strip(),
-                        'is_multiline': True
-                    })
-                    current_block = ""
-                
-                # Add single line
+                # Single line statement, blank line or comment
                 processed.append({
                     'line_num': i,
                     'code': line,
@@ -2678,45 +1838,34 @@ class ScientificCalculator(QMainWindow):
                 })
         
         # Handle any remaining block
-        if current_block:
+        if block_lines is not None:
             processed.append({
                 'line_num': block_start,
-                'code': current_block.strip(),
+                'code': '\n'.join(block_lines).strip(),
                 'is_multiline': True
             })
         
         return processed
     
     def execute_multiline_code(self, code_block):
-        """Execute multi-line code block"""
-        try:
-            # Try to compile and execute the code
-            compiled_code = compile(code_block, '<calculator>', 'exec')
-            
-            # Create a local namespace for execution
-            local_ns = {}
-            exec(compiled_code, self.namespace, local_ns)
-            
-            # Update variables with any new assignments
-            self.variables.update(local_ns)
-            
-            # Check if the last line is an expression (return its value)
-            lines = code_block.strip().split('\n')
-            last_line = lines[-1].strip()
-            
-            # Try to evaluate the last line as an expression
-            if last_line and not any(last_line.startswith(kw) for kw in 
-                                   ['def ', 'class ', 'if ', 'for ', 'while ', 'try:', 'except', 'finally:', 'with ', 'elif ', 'else:', 'return ', 'yield ', 'import ', 'from ']):
-                try:
-                    result = eval(last_line, self.namespace, local_ns)
-                    return result
-                except:
-                    pass
-            
-            return None
-            
-        except Exception as e:
-            raise e
+        """Execute multi-line code block, returning the value of a final expression"""
+        statements_code, expression_code = _compile_block(code_block)
+        
+        # Create a local namespace for execution
+        local_ns = {}
+        exec(statements_code, self.namespace, local_ns)
+        result = None
+        if expression_code is not None:
+            result = eval(expression_code, self.namespace, local_ns)
+        
+        # Later lines see every binding, but modules and _private helpers
+        # are not listed as variables
+        self.variables.update({
+            name: value for name, value in local_ns.items()
+            if not name.startswith('_') and not isinstance(value, types.ModuleType)
+        })
+        self.namespace.update(local_ns)
+        return result
     
     def format_result(self, result):
         """Format calculation result for display"""
@@ -2724,24 +1873,11 @@ class ScientificCalculator(QMainWindow):
             return "None"
         
         # Handle different types
-        if isinstance(result, bool):
-            return str(result)
-        elif isinstance(result, (int, float)):
-            if isinstance(result, float):
-                # Use scientific notation for very large or very small numbers
-                if abs(result) > 1e10 or (abs(result) < 1e-4 and result != 0):
-                    return f"{result:.{self.decimal_precision}e}"
-                else:
-                    return f"{result:.{self.decimal_precision}g}"
-            else:
-                return str(result)
-        elif isinstance(result, complex):
-            if result.imag == 0:
-                return self.format_result(result.real)
-            elif result.real == 0:
-                return f"{result.imag:.{self.decimal_precision}g}j"
-            else:
-                return f"({result.real:.{self.decimal_precision}g}{'+' if result.imag >= 0 else ''}{result.imag:.{self.decimal_precision}g}j)"
+        if isinstance(result, (bool, int, float, complex)):
+            if not result:
+                # 0.0 and -0.0 are the same cache key but display differently
+                return _format_number.__wrapped__(result, self.decimal_precision)
+            return _format_number(result, self.decimal_precision)
         elif hasattr(result, '__iter__') and not isinstance(result, str):
             # Handle arrays, lists, tuples
             try:
@@ -2853,48 +1989,34 @@ class ScientificCalculator(QMainWindow):
     
     def apply_styling(self):
         """Apply current styling settings to the interface"""
-        # Apply styling to all document editors
+        # One style sheet on the tab widget styles every document editor, so
+        # Qt polishes the editors once instead of once per setStyleSheet call
+        if self.theme == "dark":
+            # Dark theme with VS Code-like colors
+            self.set_editor_style_sheet("#1e1e1e", "#d4d4d4", "#3c3c3c", "#264f78")
+        else:
+            # Light theme with custom colors
+            self.set_editor_style_sheet(self.bg_color.name(), self.text_color.name(), "#ccc", "#3399ff")
+        
+        # Apply the font and highlighter theme to all document editors
         for i in range(self.tab_widget.count()):
             widget = self.tab_widget.widget(i)
             if widget and hasattr(widget, 'editor'):
                 editor = widget.editor
                 editor.setFont(self.text_font)
                 
-                if self.theme == "dark":
-                    # Dark theme with VS Code-like colors
-                    editor.setStyleSheet(f"""
-                        QPlainTextEdit {{
-                            background-color: #1e1e1e;
-                            color: #d4d4d4;
-                            border: 1px solid #3c3c3c;
-                            line-height: 1.4;
-                            padding: 10px;
-                            selection-background-color: #264f78;
-                            selection-color: white;
-                        }}
-                    """)
-                    # Reset highlighter to dark theme
-                    if hasattr(widget, 'highlighter'):
+                # Rehighlighting reruns every rule over the whole document, so
+                # it is skipped when only the font or colors changed
+                if hasattr(widget, 'highlighter') and widget.highlighter_theme != self.theme:
+                    if self.theme == "dark":
+                        # Reset highlighter to dark theme
                         widget.highlighter.setup_highlighting_rules()
-                else:
-                    # Light theme with custom colors
-                    editor.setStyleSheet(f"""
-                        QPlainTextEdit {{
-                            background-color: {self.bg_color.name()};
-                            color: {self.text_color.name()};
-                            border: 1px solid #ccc;
-                            line-height: 1.4;
-                            padding: 10px;
-                            selection-background-color: #3399ff;
-                            selection-color: white;
-                        }}
-                    """)
-                    # Update highlighter to light theme
-                    if hasattr(widget, 'highlighter'):
+                    else:
+                        # Update highlighter to light theme
                         widget.highlighter.setup_light_theme()
-                
-                # Force rehighlighting
-                if hasattr(widget, 'highlighter'):
+                    widget.highlighter_theme = self.theme
+                    
+                    # Force rehighlighting
                     widget.highlighter.rehighlight()
         
         # Variables display styling in AI panel
@@ -2911,6 +2033,20 @@ class ScientificCalculator(QMainWindow):
                 }}
             """)
         
+    def set_editor_style_sheet(self, background, text, border, selection):
+        """Style all document editors, including ones opened later"""
+        self.tab_widget.setStyleSheet(f"""
+            QPlainTextEdit#calcEditor {{
+                background-color: {background};
+                color: {text};
+                border: 1px solid {border};
+                line-height: 1.4;
+                padding: 10px;
+                selection-background-color: {selection};
+                selection-color: white;
+            }}
+        """)
+    
     def update_highlighter_theme(self):
         """Update syntax highlighter colors based on current theme"""
         if hasattr(self, 'highlighter'):
@@ -2928,6 +2064,9 @@ class ScientificCalculator(QMainWindow):
         
     def print_document(self):
         """Print the document and results"""
+        # QtPrintSupport is only needed here, so it is not loaded at startup
+        from PySide6.QtPrintSupport import QPrintDialog, QPrinter
+        
         printer = QPrinter()
         dialog = QPrintDialog(printer, self)
         
@@ -2995,28 +2134,51 @@ class HistoryPanel(QWidget):
     
     def add_calculation(self, expression, result):
         """Add a calculation to the history"""
-        timestamp = QTimer().remainingTime()  # Simple timestamp
-        history_item = {
-            'expression': expression,
-            'result': result,
-            'timestamp': timestamp
-        }
-        
-        self.history.append(history_item)
+        self.add_calculations([(expression, result)])
+    
+    def add_calculations(self, calculations):
+        """Add (expression, result) pairs to the history in one list update.
         
-        # Update list widget
-        display_text = f"{expression} = {result}"
-        if len(display_text) > 60:
-            display_text = display_text[:57] + "..."
+        A pair repeating the most recent entry is not added again.
+        """
+        timestamp = QTimer().remainingTime()  # Simple timestamp
+        list_items = []
+        last = (self.history[-1]['expression'], self.history[-1]['result']) if self.history else None
+        for expression, result in calculations:
+            if (expression, result) == last:
+                continue
+            last = (expression, result)
+            history_item = {
+                'expression': expression,
+                'result': result,
+                'timestamp': timestamp
+            }
+            self.history.append(history_item)
             
-        list_item = QListWidgetItem(display_text)
-        list_item.setData(Qt.ItemDataRole.UserRole, history_item)
-        self.history_list.addItem(list_item)
+            # Update list widget
+            display_text = f"{expression} = {result}"
+            if len(display_text) > 60:
+                display_text = display_text[:57] + "..."
+                
+            list_item = QListWidgetItem(display_text)
+            list_item.setData(Qt.ItemDataRole.UserRole, history_item)
+            list_items.append(list_item)
         
-        # Keep only last 100 items
-        if self.history_list.count() > 100:
-            self.history_list.takeItem(0)
-            self.history.pop(0)
+        if not list_items:
+            return
+        self.history_list.setUpdatesEnabled(False)
+        try:
+            for list_item in list_items:
+                self.history_list.addItem(list_item)
+            
+            # Keep only last 100 items
+            excess = self.history_list.count() - 100
+            for _ in range(excess):
+                self.history_list.takeItem(0)
+        finally:
+            self.history_list.setUpdatesEnabled(True)
+        if excess > 0:
+            del self.history[:excess]
     
     def restore_calculation(self, item):
         """Restore a calculation from history to the current editor"""
@@ -3376,6 +2538,7 @@ class VariableInspector(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.rows = []  # (name, type, value) texts shown in the tree
         self.setup_ui()
         
     def setup_ui(self):
@@ -3416,15 +2579,19 @@ class VariableInspector(QWidget):
     
     def update_variables(self, variables):
         """Update the variables display"""
-        self.variables_tree.clear()
-        
+        rows = []
         for name, value in variables.items():
-            item = QTreeWidgetItem([
-                name,
-                type(value).__name__,
-                str(value)[:100] + ("..." if len(str(value)) > 100 else "")
-            ])
-            self.variables_tree.addTopLevelItem(item)
+            text = str(value)
+            rows.append((name, type(value).__name__, text[:100] + ("..." if len(text) > 100 else "")))
+        
+        # Most recalculations leave the variables as they were; keep the
+        # tree (and its selection) instead of rebuilding identical rows
+        if rows == self.rows:
+            return
+        self.rows = rows
+        
+        self.variables_tree.clear()
+        self.variables_tree.addTopLevelItems([QTreeWidgetItem(list(row)) for row in rows])
     
     def refresh_variables(self):
         """Refresh variables from parent"""
@@ -3544,12 +2711,12 @@ class ThemeCustomizer(QDialog):
         
         # Connect signals
         self.theme_combo.currentTextChanged.connect(self.load_preset_theme)
-        self.bg_color_btn.clicked.connect(lambda: self.choose_color('bg'))
-        self.text_color_btn.clicked.connect(lambda: self.choose_color('text'))
-        self.keyword_color_btn.clicked.connect(lambda: self.choose_color('keyword'))
-        self.string_color_btn.clicked.connect(lambda: self.choose_color('string'))
-        self.comment_color_btn.clicked.connect(lambda: self.choose_color('comment'))
-        self.number_color_btn.clicked.connect(lambda: self.choose_color('number'))
+        self.bg_color_btn.clicked.connect(partial(self.choose_color, 'bg'))
+        self.text_color_btn.clicked.connect(partial(self.choose_color, 'text'))
+        self.keyword_color_btn.clicked.connect(partial(self.choose_color, 'keyword'))
+        self.string_color_btn.clicked.connect(partial(self.choose_color, 'string'))
+        self.comment_color_btn.clicked.connect(partial(self.choose_color, 'comment'))
+        self.number_color_btn.clicked.connect(partial(self.choose_color, 'number'))
         self.font_btn.clicked.connect(self.choose_font)
         
         # Initialize colors
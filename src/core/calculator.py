@@ -16,6 +16,68 @@ from ..dialogs.theme_customizer import ThemeCustomizer
 from ..dialogs.settings_dialog import SettingsDialog
 from ..dialogs.algebra_helper_dialog import AlgebraHelperDialog
 from ..widgets.math_function_taskbar import MathFunctionTaskbar
+import ast
+import importlib
+from functools import lru_cache
+from types import MappingProxyType
+
+
+class LazyNamespace(dict):
+    """Calculation namespace whose library entries are imported on first use.
+
+    *lazy_names* maps a name to ``(module, attribute)``, or ``(module, None)``
+    for the module itself. Importing SciPy and SymPy takes seconds, so this
+    only happens once an expression actually refers to one of their names.
+    """
+    
+    def __init__(self, values, lazy_names):
+        super().__init__(values)
+        self.lazy_names = lazy_names
+    
+    def __missing__(self, name):
+        if name not in self.lazy_names:
+            raise KeyError(name)
+        module_name, attribute = self.lazy_names[name]
+        value = importlib.import_module(module_name)
+        if attribute is not None:
+            value = getattr(value, attribute)
+        self[name] = value
+        return value
+    
+    def __contains__(self, name):
+        return super().__contains__(name) or name in self.lazy_names
+    
+    def copy(self):
+        return LazyNamespace(self, self.lazy_names)
+
+
+def _library_names(module_name, names):
+    """Lazy namespace entries for attributes of a module, under their own names"""
+    return {name: (module_name, name) for name in names}
+
+
+@lru_cache(maxsize=1024)
+def _compile_line(source):
+    """Compile a document expression, reusing the code object for unchanged text.
+
+    Returns the code object and the names it reads from the namespace, so a
+    line using an undefined name can be rejected without evaluating it.
+    """
+    tree = ast.parse(source, '<string>', mode='eval')
+    # Comprehension variables, walrus targets and lambda parameters are
+    # bound by the expression itself
+    bound = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+    names = dict.fromkeys(
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound
+    )
+    return compile(tree, '<string>', 'eval'), tuple(names)
+
 
 class ScientificCalculator(QMainWindow):
     """Main calculator application window"""
@@ -39,7 +101,6 @@ class ScientificCalculator(QMainWindow):
         
         # Setup UI
         self.setup_ui()
-        self.setup_calculation_namespace()
         self.setup_menu_bar()
         self.setup_toolbar()
         
@@ -49,6 +110,19 @@ class ScientificCalculator(QMainWindow):
         
         # Auto-save timer
         self.setup_auto_save()
+        
+        # The plot canvas pulls in numpy and a plotting library; build it and
+        # the calculation namespace once the window has been painted
+        self._heavy_initialized = False
+        QTimer.singleShot(0, self.init_heavy_subsystems)
+
+    def init_heavy_subsystems(self):
+        """Build the calculation namespace and plot canvas (safe to call repeatedly)"""
+        if self._heavy_initialized:
+            return
+        self._heavy_initialized = True
+        self.setup_calculation_namespace()
+        self.graph_widget.setup_canvas()
 
     def setup_calculation_namespace(self):
         """Prepare the safe evaluation namespace for calculations"""
@@ -81,104 +155,66 @@ class ScientificCalculator(QMainWindow):
             "tuple": tuple,
         }
         
+        # Library entries are imported on first use, see LazyNamespace
+        lazy_names = {}
         if NUMPY_AVAILABLE:
-            base_namespace.update({
-                "np": np,
-                "array": np.array,
-                "arange": np.arange,
-                "linspace": np.linspace,
-                "zeros": np.zeros,
-                "ones": np.ones,
-            })
+            lazy_names["np"] = ("numpy", None)
+            lazy_names.update(_library_names("numpy", [
+                "array", "arange", "linspace", "zeros", "ones",
+            ]))
         
         if SCIPY_AVAILABLE:
-            base_namespace.update({
-                "sp": sp,
-                "linalg": linalg,
-                "optimize": optimize,
-                "integrate": integrate,
-                "stats": stats,
+            lazy_names.update({
+                "sp": ("scipy", None),
+                "linalg": ("scipy.linalg", None),
+                "optimize": ("scipy.optimize", None),
+                "integrate": ("scipy.integrate", None),
+                "stats": ("scipy.stats", None),
             })
         
         if SYMPY_AVAILABLE:
-            base_namespace.update({
-                "sym": sym,
+            lazy_names["sym"] = ("sympy", None)
+            lazy_names.update(_library_names("sympy", [
                 # Core symbolic functions
-                "symbols": symbols,
-                "Symbol": Symbol,
-                "sympify": sympify,
-                "parse_expr": parse_expr,
-                # Constants
-                "I": sympy_I,  # Imaginary unit
-                "E": E,  # Euler's number
-                "pi": pi,
-                "oo": oo,  # Infinity
-                "zoo": zoo,  # Complex infinity
+                "symbols", "Symbol", "sympify", "parse_expr",
+                # Constants: imaginary unit, Euler's number, pi, infinity,
+                # complex infinity
+                "I", "E", "pi", "oo", "zoo",
                 # Algebraic operations (condensing/expanding formulas)
-                "expand": expand,
-                "factor": factor,
-                "simplify": simplify,
-                "collect": collect,
-                "apart": apart,
-                "together": together,
-                "cancel": cancel,
-                "trigsimp": trigsimp,
-                "expand_trig": expand_trig,
-                "powsimp": powsimp,
-                "expand_log": expand_log,
-                "expand_power_base": expand_power_base,
-                "expand_power_exp": expand_power_exp,
-                "expand_complex": expand_complex,
+                "expand", "factor", "simplify", "collect", "apart", "together",
+                "cancel", "trigsimp", "expand_trig", "powsimp", "expand_log",
+                "expand_power_base", "expand_power_exp", "expand_complex",
                 # Simplification variants
-                "nsimplify": nsimplify,
-                "ratsimp": ratsimp,
-                "radsimp": radsimp,
-                "powdenest": powdenest,
+                "nsimplify", "ratsimp", "radsimp", "powdenest",
                 # Equation solving
-                "solve": solve,
-                "solveset": solveset,
-                "linsolve": linsolve,
-                "nonlinsolve": nonlinsolve,
-                "solve_poly_system": solve_poly_system,
+                "solve", "solveset", "linsolve", "nonlinsolve", "solve_poly_system",
                 # Calculus
-                "diff": diff,
-                "sym_integrate": sym_integrate,
-                "limit": limit,
-                "series": series,
-                "summation": summation,
-                "product": product,
+                "diff", "limit", "series", "summation", "product",
                 # Matrix operations
-                "Matrix": Matrix,
-                "eye": eye,
-                "sym_zeros": sym_zeros,
-                "sym_ones": sym_ones,
-                "diag": diag,
+                "Matrix", "eye", "diag",
                 # Relations
-                "Eq": Eq,
-                "Ne": Ne,
-                "Lt": Lt,
-                "Le": Le,
-                "Gt": Gt,
-                "Ge": Ge,
+                "Eq", "Ne", "Lt", "Le", "Gt", "Ge",
                 # Number theory
-                "isprime": isprime,
-                "factorint": factorint,
-                "divisors": divisors,
-                "gcd": gcd,
-                "lcm": lcm,
+                "isprime", "factorint", "divisors", "gcd", "lcm",
                 # Special functions
-                "factorial": factorial,
-                "binomial": binomial,
-                "sqrt": sqrt,
-                "cbrt": cbrt,
-                "root": root,
+                "factorial", "binomial", "sqrt", "cbrt", "root",
                 # Printing/display
-                "latex": latex,
-                "pretty": pretty,
-                "pprint": pprint,
+                "latex", "pretty", "pprint",
+            ]))
+            # Renamed to avoid clashing with scipy.integrate and numpy
+            lazy_names.update({
+                "sym_integrate": ("sympy", "integrate"),
+                "sym_zeros": ("sympy", "zeros"),
+                "sym_ones": ("sympy", "ones"),
             })
         
-        self.base_namespace = base_namespace
+        base_namespace = LazyNamespace(base_namespace, lazy_names)
+        
+        # Read-only view: each recalculation starts from base_namespace.copy()
+        # (LazyNamespace.copy, which keeps the not yet imported entries
+        # lazy), and eval'd input such as a walrus in edit_variable cannot
+        # leak into the defaults
+        self.base_namespace = MappingProxyType(base_namespace)
         self.namespace = self.base_namespace.copy()
         
     def setup_ui(self):
@@ -201,7 +237,14 @@ class ScientificCalculator(QMainWindow):
         
         self.line_results = {}
         self.last_text = ""
-        self.calculation_timer = None
+        
+        # One restartable timer coalesces bursts of keystrokes into a single
+        # recalculation of the editor that changed last
+        self.pending_calculation_editor = None
+        self.calculation_timer = QTimer(self)
+        self.calculation_timer.setSingleShot(True)
+        self.calculation_timer.setInterval(500)  # Wait 500ms after last keystroke
+        self.calculation_timer.timeout.connect(self.run_pending_calculation)
     
     def setup_dock_widgets(self):
         """Setup dock widgets for additional features"""
@@ -261,7 +304,7 @@ class ScientificCalculator(QMainWindow):
         document_editor.cursorPositionChanged.connect(lambda: self.on_cursor_changed(document_editor))
         
         # Apply Python syntax highlighting
-        highlighter = PythonSyntaxHighlighter(document_editor.document())
+        highlighter = PythonSyntaxHighlighter(document_editor.document(), document_editor)
         
         doc_layout.addWidget(document_editor)
         
@@ -420,18 +463,14 @@ class ScientificCalculator(QMainWindow):
                     sorted_group = sorted(group_funcs, key=lambda f: (POPULARITY.get(category, []).index(f) if f in POPULARITY.get(category, []) else 9999))
                     for func in sorted_group:
                         if func in functions:
-                            action = QAction(func, self)
-                            action.triggered.connect(lambda checked, c=category, f=func: self.insert_function(f"{c}.{f}(") )
-                            lib_menu.addAction(action)
+                            self.add_insert_action(lib_menu, func, f"{category}.{func}(")
                             used.add(func)
                     lib_menu.addSeparator()
             # Add remaining functions not in any group, sorted by popularity
             remaining = [func for func in functions if func not in used]
             sorted_remaining = sorted(remaining, key=lambda f: (POPULARITY.get(category, []).index(f) if f in POPULARITY.get(category, []) else 9999))
             for func in sorted_remaining:
-                action = QAction(func, self)
-                action.triggered.connect(lambda checked, c=category, f=func: self.insert_function(f"{c}.{f}(") )
-                lib_menu.addAction(action)
+                self.add_insert_action(lib_menu, func, f"{category}.{func}(")
         
         # Help menu
         help_menu = menubar.addMenu("Help")
@@ -443,13 +482,14 @@ class ScientificCalculator(QMainWindow):
     def on_text_changed(self, editor):
         """Handle text changes in a specific editor"""
         # Use a timer to avoid recalculating on every keystroke
-        if hasattr(self, 'calculation_timer') and self.calculation_timer:
-            self.calculation_timer.stop()
-        
-        self.calculation_timer = QTimer()
-        self.calculation_timer.setSingleShot(True)
-        self.calculation_timer.timeout.connect(lambda: self.recalculate_changed_lines(editor))
-        self.calculation_timer.start(500)  # Wait 500ms after last keystroke
+        self.pending_calculation_editor = editor
+        self.calculation_timer.start()
+    
+    def run_pending_calculation(self):
+        """Recalculate the editor whose text changed, once typing pauses"""
+        editor, self.pending_calculation_editor = self.pending_calculation_editor, None
+        if editor is not None:
+            self.recalculate_changed_lines(editor)
     
     def on_cursor_changed(self, editor):
         """Handle cursor position changes in a specific editor"""
@@ -466,6 +506,7 @@ class ScientificCalculator(QMainWindow):
     
     def recalculate_changed_lines(self, editor):
         """Recalculate lines that have changed for a specific editor"""
+        self.init_heavy_subsystems()
         # Reset namespace to the predefined safe defaults before recalculation
         self.namespace = self.base_namespace.copy()
         
@@ -488,13 +529,13 @@ class ScientificCalculator(QMainWindow):
                     var_name = var_name.strip()
                     expression = expression.strip()
                     
-                    result = eval(expression, {"__builtins__": {}}, self.namespace)
+                    result = self.evaluate_expression(expression)
                     self.variables[var_name] = result
                     self.namespace[var_name] = result
                     self.line_results[i] = f"{var_name} = {self.format_result(result)}"
                 else:
                     # Expression evaluation
-                    result = eval(line, {"__builtins__": {}}, self.namespace)
+                    result = self.evaluate_expression(line)
                     if result is not None:
                         self.line_results[i] = self.format_result(result)
                         
@@ -506,6 +547,16 @@ class ScientificCalculator(QMainWindow):
         self.update_inline_results(editor)
         self.update_variables_display()
     
+    def evaluate_expression(self, source):
+        """Evaluate one document expression in the calculation namespace"""
+        code, names = _compile_line(source)
+        # A set lookup per name is much cheaper than starting the evaluation
+        # and unwinding the NameError (e.g. halfway through a typed name)
+        for name in names:
+            if name not in self.namespace:
+                raise NameError(f"name '{name}' is not defined")
+        return eval(code, {"__builtins__": {}}, self.namespace)
+    
     def format_result(self, result):
         """Format calculation result for display"""
         if result is None:
@@ -550,17 +601,30 @@ class ScientificCalculator(QMainWindow):
     
     def update_inline_results(self, editor):
         """Update inline results in the specified code editor"""
-        # Clear existing line results
-        editor.clear_line_results()
-        
-        # Set results for each line
-        for line_num, result in self.line_results.items():
-            editor.set_line_result(line_num + 1, result)  # line_num is 0-based, display is 1-based
+        # Replace all results in one go so the editor repaints once
+        editor.set_line_results({
+            line_num + 1: result  # line_num is 0-based, display is 1-based
+            for line_num, result in self.line_results.items()
+        })
     
     def update_variables_display(self):
         """Update the variables display in the variable inspector"""
         self.variables_widget.update_variables(self.variables)
     
+    def add_insert_action(self, menu, name, text):
+        """Add a menu action that inserts text into the current editor"""
+        # The text rides along as action data so every action shares one
+        # bound slot instead of owning a lambda
+        action = QAction(name, self)
+        action.setData(text)
+        action.triggered.connect(self.on_insert_action_triggered)
+        menu.addAction(action)
+        return action
+    
+    def on_insert_action_triggered(self):
+        """Insert the text of the menu action that was triggered"""
+        self.insert_function(self.sender().data())
+    
     # Additional menu setup methods would go here...
     def setup_math_menu(self, menubar):
         """Setup the Math Functions menu"""
@@ -577,9 +641,7 @@ class ScientificCalculator(QMainWindow):
             ("atan(x)", "math.atan("),
         ]
         for name, func in trig_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            trig_menu.addAction(action)
+            self.add_insert_action(trig_menu, name, func)
     
     def setup_random_menu(self, menubar):
         """Setup the Random menu"""
@@ -594,9 +656,7 @@ class ScientificCalculator(QMainWindow):
             ("gauss(mu, sigma)", "random.gauss("),
         ]
         for name, func in random_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            random_menu.addAction(action)
+            self.add_insert_action(random_menu, name, func)
     
     def setup_statistics_menu(self, menubar):
         """Setup the Statistics menu"""
@@ -611,9 +671,7 @@ class ScientificCalculator(QMainWindow):
             ("variance(data)", "statistics.variance("),
         ]
         for name, func in basic_stats:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            stats_menu.addAction(action)
+            self.add_insert_action(stats_menu, name, func)
     
     def setup_cmath_menu(self, menubar):
         """Setup the Complex Math menu"""
@@ -631,9 +689,7 @@ class ScientificCalculator(QMainWindow):
             ("tan(z)", "cmath.tan("),
         ]
         for name, func in cmath_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            cmath_menu.addAction(action)
+            self.add_insert_action(cmath_menu, name, func)
     
     def setup_decimal_menu(self, menubar):
         """Setup the Decimal menu"""
@@ -645,9 +701,7 @@ class ScientificCalculator(QMainWindow):
             ("setcontext(ctx)", "decimal.setcontext("),
         ]
         for name, func in decimal_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            decimal_menu.addAction(action)
+            self.add_insert_action(decimal_menu, name, func)
     
     def setup_fractions_menu(self, menubar):
         """Setup the Fractions menu"""
@@ -659,9 +713,7 @@ class ScientificCalculator(QMainWindow):
             ("Fraction.from_decimal(value)", "fractions.Fraction.from_decimal("),
         ]
         for name, func in fraction_functions:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, f=func: self.insert_function(f))
-            fractions_menu.addAction(action)
+            self.add_insert_action(fractions_menu, name, func)
     
     def setup_constants_menu(self, menubar):
         """Setup the Constants menu"""
@@ -675,9 +727,7 @@ class ScientificCalculator(QMainWindow):
             ("NaN", "math.nan"),
         ]
         for name, const in constants:
-            action = QAction(name, self)
-            action.triggered.connect(lambda checked, c=const: self.insert_function(c))
-            constants_menu.addAction(action)
+            self.add_insert_action(constants_menu, name, const)
     
     def setup_toolbar(self): pass
     
@@ -765,6 +815,7 @@ class ScientificCalculator(QMainWindow):
         """Print current document"""
         editor = self.get_current_editor()
         if editor:
+            from .imports import QPrinter, QPrintDialog
             printer = QPrinter(QPrinter.PrinterMode.HighResolution)
             dialog = QPrintDialog(printer, self)
             if dialog.exec() == QPrintDialog.DialogCode.Accepted:
@@ -904,6 +955,7 @@ class ScientificCalculator(QMainWindow):
     def clear_variables(self):
         """Clear all variables"""
         self.variables.clear()
+        self.init_heavy_subsystems()
         self.namespace = self.base_namespace.copy()
         self.variables_widget.update_variables({})
         # Clear line results and recalculate
@@ -927,6 +979,7 @@ class ScientificCalculator(QMainWindow):
         """Edit a variable value"""
         try:
             # Try to evaluate the new value
+            self.init_heavy_subsystems()
             new_value = eval(new_value_str, {"__builtins__": {}}, self.base_namespace)
             self.variables[var_name] = new_value
             self.namespace[var_name] = new_value
@@ -1106,6 +1159,11 @@ class ScientificCalculator(QMainWindow):
         self.config_manager.save_window_geometry(self)
         self.config_manager.save_dock_layout(self)
     
+    def sync_settings(self):
+        """Write pending QSettings changes to disk"""
+        self.settings.sync()
+        self.config_manager.settings.sync()
+    
     def setup_auto_save(self):
         """Setup auto-save timer for configuration"""
         self.auto_save_timer = QTimer()
@@ -6,85 +6,100 @@ import sys
 import os
 import math
 import random
-import statistics
-import cmath
-import decimal
-import fractions
 import traceback
 import re
+import importlib
+import importlib.util
 from typing import Dict, Any
-import threading
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
-
-# Import AI libraries - Using Ollama instead of transformers
-try:
-    import requests
-    import json
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
-
-# Import libraries with error handling
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    np = None
-    NUMPY_AVAILABLE = False
-
-try:
-    import scipy as sp
-    from scipy import linalg, optimize, integrate, stats
-    SCIPY_AVAILABLE = True
-except ImportError:
-    sp = None
-    SCIPY_AVAILABLE = False
-
-try:
-    import sympy as sym
-    from sympy import (
-        symbols, expand, factor, simplify, solve, diff, integrate as sym_integrate,
-        # Algebraic operations
-        collect, apart, together, cancel, trigsimp, expand_trig, powsimp,
-        expand_log, expand_power_base, expand_power_exp, expand_complex,
-        # Equation solving
-        solveset, linsolve, nonlinsolve, solve_poly_system,
-        # Symbolic variables and expressions
-        Symbol, I as sympy_I, E, pi, oo, zoo,
-        # Matrix operations
-        Matrix, eye, zeros as sym_zeros, ones as sym_ones, diag,
-        # Calculus
-        limit, series, summation, product,
-        # Simplification
-        simplify, nsimplify, ratsimp, radsimp, powdenest,
-        # Logic and sets
-        Eq, Ne, Lt, Le, Gt, Ge,
-        # Number theory
-        isprime, factorint, divisors, gcd, lcm,
-        # Special functions
-        factorial, binomial, sqrt, cbrt, root,
-        # Parsing
-        sympify, parse_expr,
-        # Printing
-        latex, pretty, pprint
-    )
-    SYMPY_AVAILABLE = True
-except ImportError:
-    sym = None
-    SYMPY_AVAILABLE = False
-
-# NOTE: Do NOT import matplotlib Qt backend or FigureCanvas at module import time here.
-# Importing backend_qtagg touches Qt and can initialize Qt before QApplication exists,
-# which may cause crashes on some platforms (especially macOS). Instead only detect
-# whether matplotlib is installed; specific Qt backend imports should be performed
-# lazily inside widgets that create plot canvases (see src/widgets/graph_plot_widget.py).
-try:
-    import matplotlib
-    MATPLOTLIB_AVAILABLE = True
-except Exception:
-    matplotlib = None
-    MATPLOTLIB_AVAILABLE = False
+
+# Names that are only needed by optional or rarely used features are resolved
+# on first access through the module-level __getattr__ below (PEP 562). They
+# are deliberately not bound at import time, so `from .imports import *` does
+# not pull them in; import them explicitly where they are used, e.g.
+# `from ..core.imports import QPrinter`.
+_LAZY = {
+    "json": ("json", None),
+    "threading": ("threading", None),
+    "asyncio": ("asyncio", None),
+    "ThreadPoolExecutor": ("concurrent.futures", "ThreadPoolExecutor"),
+    # AI libraries - Using Ollama instead of transformers
+    "requests": ("requests", None),
+    "QPrinter": ("PySide6.QtPrintSupport", "QPrinter"),
+    "QPrintDialog": ("PySide6.QtPrintSupport", "QPrintDialog"),
+}
+
+
+def __getattr__(name):
+    """Import and cache a lazily-provided name on first access"""
+    try:
+        module_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = importlib.import_module(module_name)
+    if attr is not None:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+AI_AVAILABLE = importlib.util.find_spec("requests") is not None
+
+
+# Heavy scientific libraries are registered lazily: the module object is
+# placed in sys.modules right away, but its body only executes on first
+# attribute access. This keeps numpy/scipy/sympy off the startup path until a
+# calculation, plot or algebra operation actually needs them.
+def _lazy_import(name):
+    """Return a lazily-loaded module for *name*, or None if it is not installed"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# statistics pulls in fractions and decimal; like cmath, they are only needed
+# once an expression uses them
+statistics = _lazy_import("statistics")
+cmath = _lazy_import("cmath")
+decimal = _lazy_import("decimal")
+fractions = _lazy_import("fractions")
+
+np = _lazy_import("numpy")
+NUMPY_AVAILABLE = np is not None
+
+sp = _lazy_import("scipy")
+SCIPY_AVAILABLE = sp is not None
+
+sym = _lazy_import("sympy")
+SYMPY_AVAILABLE = sym is not None
+
+# Optional: evaluates plain arithmetic plot expressions with multithreaded,
+# vectorized kernels
+ne = _lazy_import("numexpr")
+NUMEXPR_AVAILABLE = ne is not None
+
+# Optional: JIT-compiles elementwise plot expressions into one parallel loop
+numba = _lazy_import("numba")
+NUMBA_AVAILABLE = numba is not None
+
+# Plotting backends are only detected here; GraphPlotWidget imports them when
+# the canvas is first created. PyQtGraph is preferred since it imports much
+# faster and draws straight through QPainter; matplotlib is the fallback.
+# Importing either one touches Qt, so it must not happen before QApplication
+# exists (this can crash on some platforms, especially macOS).
+PYQTGRAPH_AVAILABLE = importlib.util.find_spec("pyqtgraph") is not None
+MATPLOTLIB_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
@@ -98,4 +113,3 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QSettings, QTimer, QRegularExpression, QSize
 from PySide6.QtGui import (QFont, QColor, QAction, QTextCursor, QTextCharFormat, 
                           QSyntaxHighlighter, QTextDocument, QPainter)
-from PySide6.QtPrintSupport import QPrintDialog, QPrinter
@@ -2,359 +2,296 @@
 Python syntax highlighter for the code editor
 """
 
+from functools import lru_cache
+
 from ..core.imports import *
 
 
+KEYWORDS = [
+    'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
+    'del', 'elif', 'else', 'except', 'exec', 'finally', 'for',
+    'from', 'global', 'if', 'import', 'in', 'is', 'lambda',
+    'not', 'or', 'pass', 'print', 'raise', 'return', 'try',
+    'while', 'with', 'yield', 'True', 'False', 'None'
+]
+
+BUILTINS = [
+    'abs', 'all', 'any', 'bin', 'bool', 'chr', 'dict', 'dir',
+    'enumerate', 'eval', 'exec', 'filter', 'float', 'format',
+    'frozenset', 'getattr', 'globals', 'hasattr', 'hash', 'help',
+    'hex', 'id', 'input', 'int', 'isinstance', 'issubclass',
+    'iter', 'len', 'list', 'locals', 'map', 'max', 'min',
+    'next', 'object', 'oct', 'open', 'ord', 'pow', 'print',
+    'range', 'repr', 'reversed', 'round', 'set', 'setattr',
+    'slice', 'sorted', 'str', 'sum', 'super', 'tuple', 'type',
+    'vars', 'zip'
+]
+
+MATH_MODULES = ['math', 'np', 'numpy', 'sp', 'scipy', 'sym', 'sympy']
+
+OPERATORS = [
+    '=', '==', '!=', '<', '<=', '>', '>=',
+    '\\+', '-', '\\*', '/', '//', '%', '\\*\\*',
+    '\\+=', '-=', '\\*=', '/=', '//=', '%=', '\\*\\*=',
+    '&', '\\|', '\\^', '~', '<<', '>>', '&=', '\\|=', '\\^=',
+    '<<=', '>>=', 'and', 'or', 'not', 'in', 'is'
+]
+
+
+def _alternation(words, template):
+    """Combine words into a single pattern, trying the longest alternatives first"""
+    return template.format('|'.join(sorted(words, key=len, reverse=True)))
+
+
+# Token patterns in priority order. All categories used by a theme are
+# combined into one regex with a named group each, so every line is scanned
+# once and a token gets exactly one format. Where several tokens could start
+# at the same position, the earlier entry wins (e.g. ``def name`` is a
+# function, not the ``def`` keyword); the leftmost token always wins, so
+# quotes and '#' inside a string or comment are not highlighted again.
+# Plain words are not listed here, see WORD_CATEGORIES.
+TOKEN_PATTERNS = [
+    ('comment', r'#.*$'),
+    # Triple quoted strings (must come before the single quoted forms)
+    ('triple_string', r"'''(?s:.*?)'''|" + r'"""(?s:.*?)"""'),
+    # Single and double quoted strings
+    ('string', r"'[^'\\]*(?:\\.[^'\\]*)*'|" + r'"[^"\\]*(?:\\.[^"\\]*)*"'),
+    ('function', r'\bdef\s+[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('class', r'\bclass\s+[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('module', _alternation(MATH_MODULES, r'\b(?:{})\.')),
+    ('operator', _alternation([op for op in OPERATORS if not op.isalpha()], '{}')),
+    # Hex, oct, bin numbers (before plain numbers, which would stop at the 0)
+    ('radix_number', r'\b0[xX][0-9a-fA-F]+\b|\b0[oO][0-7]+\b|\b0[bB][01]+\b'),
+    # Integer and float patterns
+    ('number', r'\b\d+\.?\d*(?:[eE][+-]?\d+)?\b'),
+    ('bracket', r'[\(\)\[\]\{\}]'),
+]
+
+# Every other identifier is matched as a whole word and looked up in a dict
+# built from these lists, instead of trying each keyword in the regex. A word
+# listed under several categories takes the first one the theme formats:
+# word operators also appear in KEYWORDS and are shown as operators, and
+# print and exec are both keywords and builtins and are shown as builtins.
+# Words in no list (or ``in`` inside ``sin``) stay unformatted.
+IDENTIFIER_PATTERN = r'[A-Za-z_][A-Za-z0-9_]*'
+
+WORD_CATEGORIES = [
+    ('self', ['self']),
+    ('operator', [op for op in OPERATORS if op.isalpha()]),
+    ('builtin', BUILTINS),
+    ('keyword', KEYWORDS),
+]
+
+
+@lru_cache(maxsize=None)
+def _token_regex(categories):
+    """Build the combined token regex for a set of categories.
+
+    Returns the compiled pattern, a list mapping each capture group number
+    to its category (None for identifiers and group 0), the identifier
+    group number and a dict mapping words to their category. Built once per
+    category set and shared by every highlighter using it.
+    """
+    alternatives = [
+        f'(?<{category}>{pattern})'
+        for category, pattern in TOKEN_PATTERNS if category in categories
+    ]
+    alternatives.append(f'(?<identifier>{IDENTIFIER_PATTERN})')
+    # Only the named groups are needed to tell categories apart; with
+    # DontCaptureOption the engine does not record any other group
+    regex = QRegularExpression(
+        '|'.join(alternatives),
+        QRegularExpression.PatternOption.DontCaptureOption,
+    )
+    regex.optimize()
+    
+    group_names = regex.namedCaptureGroups()
+    group_categories = [name if name in categories else None for name in group_names]
+    
+    word_categories = {}
+    for category, words in WORD_CATEGORIES:
+        if category in categories:
+            for word in words:
+                word_categories.setdefault(word, category)
+    return regex, group_categories, group_names.index('identifier'), word_categories
+
+
+# Number of distinct lines whose highlighting spans are remembered
+SPAN_CACHE_SIZE = 4096
+
+# Blocks further than this from the visible ones are highlighted only once
+# they are scrolled into view; until then their block state is DEFERRED_STATE
+HIGHLIGHT_MARGIN = 50
+DEFERRED_STATE = -2
+
+# Font style per token category; categories not listed use the plain font
+RULE_STYLES = {
+    'keyword': {'bold': True},
+    'comment': {'italic': True},
+    'function': {'bold': True},
+    'class': {'bold': True},
+    'module': {'bold': True},
+    'bracket': {'bold': True},
+    'self': {'bold': True},
+}
+
+# VS Code-like color scheme
+DARK_COLORS = {
+    'keyword': (86, 156, 214),  # Light blue
+    'builtin': (220, 220, 170),  # Light yellow
+    'number': (181, 206, 168),  # Light green
+    'radix_number': (181, 206, 168),
+    'string': (206, 145, 120),  # Orange/salmon
+    'triple_string': (206, 145, 120),
+    'comment': (106, 153, 85),  # Green
+    'function': (220, 220, 170),  # Light yellow
+    'class': (78, 201, 176),  # Cyan/turquoise
+    'module': (156, 220, 254),  # Light blue
+    'operator': (212, 212, 212),  # Light gray
+    'bracket': (255, 215, 0),  # Gold
+    'self': (86, 156, 214),  # Light blue
+}
+
+# Light theme colors (darker colors for better visibility on light background)
+LIGHT_COLORS = {
+    'keyword': (0, 0, 255),  # Blue
+    'builtin': (128, 0, 128),  # Purple
+    'number': (139, 0, 0),  # Dark red
+    'radix_number': (139, 0, 0),
+    'string': (0, 128, 0),  # Dark green
+    'triple_string': (0, 128, 0),
+    'comment': (128, 128, 128),  # Gray
+    'function': (0, 0, 139),  # Dark blue
+    'class': (0, 139, 139),  # Dark cyan
+    'module': (0, 0, 139),  # Dark blue
+    'operator': (0, 0, 0),  # Black
+    'bracket': (255, 140, 0),  # Dark orange
+    'self': (0, 0, 255),  # Blue
+}
+
+
+def _char_format(color, bold=False, italic=False):
+    """Create a QTextCharFormat with the given foreground color"""
+    char_format = QTextCharFormat()
+    char_format.setForeground(color)
+    if bold:
+        char_format.setFontWeight(QFont.Weight.Bold)
+    if italic:
+        char_format.setFontItalic(True)
+    return char_format
+
+
+@lru_cache(maxsize=16)
+def _theme_formats(colors):
+    """Build the formats of a theme from (category, rgb) pairs.
+
+    Cached, so switching back to a theme, or opening another editor with
+    it, reuses the same format objects.
+    """
+    return {
+        category: _char_format(QColor(*rgb), **RULE_STYLES.get(category, {}))
+        for category, rgb in colors
+    }
+
+
 class PythonSyntaxHighlighter(QSyntaxHighlighter):
     """Python syntax highlighter with VS Code-like colors"""
     
-    def __init__(self, document: QTextDocument):
+    def __init__(self, document: QTextDocument, editor=None):
         super().__init__(document)
+        # With the CodeEditor showing the document, blocks far off screen
+        # are highlighted lazily
+        self._editor = editor
         self.setup_highlighting_rules()
+        if editor is not None:
+            editor.visible_blocks_changed.connect(self.highlight_deferred_blocks)
+    
+    def set_rule_formats(self, formats):
+        """Use the formats of a theme, keyed by token category.
+        
+        Categories missing from *formats* are not highlighted.
+        """
+        self._span_cache = {}
+        (self.token_regex, group_categories, self.identifier_group,
+         word_categories) = _token_regex(frozenset(formats))
+        # Format for each capture group number (None: leave unformatted)
+        self.group_formats = [
+            formats[category] if category else None
+            for category in group_categories
+        ]
+        self.word_formats = {
+            word: formats[category] for word, category in word_categories.items()
+        }
     
     def setup_highlighting_rules(self):
         """Setup the highlighting rules for Python syntax"""
-        self.highlighting_rules = []
-        
-        # VS Code-like color scheme
-        # Keywords (purple/magenta)
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor(86, 156, 214))  # Light blue
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        
-        keywords = [
-            'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
-            'del', 'elif', 'else', 'except', 'exec', 'finally', 'for',
-            'from', 'global', 'if', 'import', 'in', 'is', 'lambda',
-            'not', 'or', 'pass', 'print', 'raise', 'return', 'try',
-            'while', 'with', 'yield', 'True', 'False', 'None'
-        ]
-        
-        for keyword in keywords:
-            pattern = QRegularExpression(f'\\b{keyword}\\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # Built-in functions (yellow)
-        builtin_format = QTextCharFormat()
-        builtin_format.setForeground(QColor(220, 220, 170))  # Light yellow
-        
-        builtins = [
-            'abs', 'all', 'any', 'bin', 'bool', 'chr', 'dict', 'dir',
-            'enumerate', 'eval', 'exec', 'filter', 'float', 'format',
-            'frozenset', 'getattr', 'globals', 'hasattr', 'hash', 'help',
-            'hex', 'id', 'input', 'int', 'isinstance', 'issubclass',
-            'iter', 'len', 'list', 'locals', 'map', 'max', 'min',
-            'next', 'object', 'oct', 'open', 'ord', 'pow', 'print',
-            'range', 'repr', 'reversed', 'round', 'set', 'setattr',
-            'slice', 'sorted', 'str', 'sum', 'super', 'tuple', 'type',
-            'vars', 'zip'
-        ]
-        
-        for builtin in builtins:
-            pattern = QRegularExpression(f'\\b{builtin}\\b')
-            self.highlighting_rules.append((pattern, builtin_format))
-        
-        # Numbers (light green)
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor(181, 206, 168))  # Light green
-        
-        # Integer and float patterns
-        number_pattern = QRegularExpression(r'\b\d+\.?\d*([eE][+-]?\d+)?\b')
-        self.highlighting_rules.append((number_pattern, number_format))
-        
-        # Hex, oct, bin numbers
-        hex_pattern = QRegularExpression(r'\b0[xX][0-9a-fA-F]+\b')
-        self.highlighting_rules.append((hex_pattern, number_format))
-        
-        oct_pattern = QRegularExpression(r'\b0[oO][0-7]+\b')
-        self.highlighting_rules.append((oct_pattern, number_format))
-        
-        bin_pattern = QRegularExpression(r'\b0[bB][01]+\b')
-        self.highlighting_rules.append((bin_pattern, number_format))
-        
-        # Strings (orange/salmon)
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor(206, 145, 120))  # Orange/salmon
-        
-        # Single quoted strings
-        single_quote_pattern = QRegularExpression(r"'[^'\\]*(\\.[^'\\]*)*'")
-        self.highlighting_rules.append((single_quote_pattern, string_format))
-        
-        # Double quoted strings
-        double_quote_pattern = QRegularExpression(r'"[^"\\]*(\\.[^"\\]*)*"')
-        self.highlighting_rules.append((double_quote_pattern, string_format))
-        
-        # Triple quoted strings (multiline)
-        triple_quote_format = QTextCharFormat()
-        triple_quote_format.setForeground(QColor(206, 145, 120))  # Orange/salmon
-        triple_single_pattern = QRegularExpression(r"'''.*?'''", QRegularExpression.PatternOption.DotMatchesEverythingOption)
-        triple_double_pattern = QRegularExpression(r'""".*?"""', QRegularExpression.PatternOption.DotMatchesEverythingOption)
-        self.highlighting_rules.append((triple_single_pattern, triple_quote_format))
-        self.highlighting_rules.append((triple_double_pattern, triple_quote_format))
-        
-        # Comments (green)
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor(106, 153, 85))  # Green
-        comment_format.setFontItalic(True)
-        
-        comment_pattern = QRegularExpression(r'#.*$')
-        self.highlighting_rules.append((comment_pattern, comment_format))
-        
-        # Function definitions (yellow)
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor(220, 220, 170))  # Light yellow
-        function_format.setFontWeight(QFont.Weight.Bold)
-        
-        function_pattern = QRegularExpression(r'\bdef\s+([a-zA-Z_][a-zA-Z0-9_]*)')
-        self.highlighting_rules.append((function_pattern, function_format))
-        
-        # Class definitions (light blue)
-        class_format = QTextCharFormat()
-        class_format.setForeground(QColor(78, 201, 176))  # Cyan/turquoise
-        class_format.setFontWeight(QFont.Weight.Bold)
-        
-        class_pattern = QRegularExpression(r'\bclass\s+([a-zA-Z_][a-zA-Z0-9_]*)')
-        self.highlighting_rules.append((class_pattern, class_format))
-        
-        # Mathematical module names (light purple)
-        module_format = QTextCharFormat()
-        module_format.setForeground(QColor(156, 220, 254))  # Light blue
-        module_format.setFontWeight(QFont.Weight.Bold)
-        
-        math_modules = ['math', 'np', 'numpy', 'sp', 'scipy', 'sym', 'sympy']
-        for module in math_modules:
-            pattern = QRegularExpression(f'\\b{module}\\.')
-            self.highlighting_rules.append((pattern, module_format))
-        
-        # Operators (white/light gray)
-        operator_format = QTextCharFormat()
-        operator_format.setForeground(QColor(212, 212, 212))  # Light gray
-        
-        operators = [
-            '=', '==', '!=', '<', '<=', '>', '>=',
-            '\\+', '-', '\\*', '/', '//', '%', '\\*\\*',
-            '\\+=', '-=', '\\*=', '/=', '//=', '%=', '\\*\\*=',
-            '&', '\\|', '\\^', '~', '<<', '>>', '&=', '\\|=', '\\^=',
-            '<<=', '>>=', 'and', 'or', 'not', 'in', 'is'
-        ]
-        
-        for op in operators:
-            pattern = QRegularExpression(f'\\s*{op}\\s*')
-            self.highlighting_rules.append((pattern, operator_format))
-        
-        # Parentheses, brackets, braces (light gray)
-        bracket_format = QTextCharFormat()
-        bracket_format.setForeground(QColor(255, 215, 0))  # Gold
-        bracket_format.setFontWeight(QFont.Weight.Bold)
-        
-        bracket_pattern = QRegularExpression(r'[\(\)\[\]\{\}]')
-        self.highlighting_rules.append((bracket_pattern, bracket_format))
-        
-        # Self keyword (purple)
-        self_format = QTextCharFormat()
-        self_format.setForeground(QColor(86, 156, 214))  # Light blue
-        self_format.setFontWeight(QFont.Weight.Bold)
-        
-        self_pattern = QRegularExpression(r'\bself\b')
-        self.highlighting_rules.append((self_pattern, self_format))
+        self.set_rule_formats(_theme_formats(tuple(DARK_COLORS.items())))
     
     def setup_light_theme(self):
         """Setup highlighting rules for light theme"""
-        self.highlighting_rules = []
-        
-        # Light theme colors (darker colors for better visibility on light background)
-        # Keywords (dark blue)
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor(0, 0, 255))  # Blue
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        
-        keywords = [
-            'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
-            'del', 'elif', 'else', 'except', 'exec', 'finally', 'for',
-            'from', 'global', 'if', 'import', 'in', 'is', 'lambda',
-            'not', 'or', 'pass', 'print', 'raise', 'return', 'try',
-            'while', 'with', 'yield', 'True', 'False', 'None'
-        ]
-        
-        for keyword in keywords:
-            pattern = QRegularExpression(f'\\b{keyword}\\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # Built-in functions (dark orange)
-        builtin_format = QTextCharFormat()
-        builtin_format.setForeground(QColor(128, 0, 128))  # Purple
-        
-        builtins = [
-            'abs', 'all', 'any', 'bin', 'bool', 'chr', 'dict', 'dir',
-            'enumerate', 'eval', 'exec', 'filter', 'float', 'format',
-            'frozenset', 'getattr', 'globals', 'hasattr', 'hash', 'help',
-            'hex', 'id', 'input', 'int', 'isinstance', 'issubclass',
-            'iter', 'len', 'list', 'locals', 'map', 'max', 'min',
-            'next', 'object', 'oct', 'open', 'ord', 'pow', 'print',
-            'range', 'repr', 'reversed', 'round', 'set', 'setattr',
-            'slice', 'sorted', 'str', 'sum', 'super', 'tuple', 'type',
-            'vars', 'zip'
-        ]
-        
-        for builtin in builtins:
-            pattern = QRegularExpression(f'\\b{builtin}\\b')
-            self.highlighting_rules.append((pattern, builtin_format))
-        
-        # Numbers (dark red)
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor(139, 0, 0))  # Dark red
-        
-        number_pattern = QRegularExpression(r'\b\d+\.?\d*([eE][+-]?\d+)?\b')
-        self.highlighting_rules.append((number_pattern, number_format))
-        
-        hex_pattern = QRegularExpression(r'\b0[xX][0-9a-fA-F]+\b')
-        self.highlighting_rules.append((hex_pattern, number_format))
-        
-        oct_pattern = QRegularExpression(r'\b0[oO][0-7]+\b')
-        self.highlighting_rules.append((oct_pattern, number_format))
-        
-        bin_pattern = QRegularExpression(r'\b0[bB][01]+\b')
-        self.highlighting_rules.append((bin_pattern, number_format))
-        
-        # Strings (dark green)
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor(0, 128, 0))  # Dark green
-        
-        single_quote_pattern = QRegularExpression(r"'[^'\\]*(\\.[^'\\]*)*'")
-        self.highlighting_rules.append((single_quote_pattern, string_format))
-        
-        double_quote_pattern = QRegularExpression(r'"[^"\\]*(\\.[^"\\]*)*"')
-        self.highlighting_rules.append((double_quote_pattern, string_format))
-        
-        triple_quote_format = QTextCharFormat()
-        triple_quote_format.setForeground(QColor(0, 128, 0))  # Dark green
-        triple_single_pattern = QRegularExpression(r"'''.*?'''", QRegularExpression.PatternOption.DotMatchesEverythingOption)
-        triple_double_pattern = QRegularExpression(r'""".*?"""', QRegularExpression.PatternOption.DotMatchesEverythingOption)
-        self.highlighting_rules.append((triple_single_pattern, triple_quote_format))
-        self.highlighting_rules.append((triple_double_pattern, triple_quote_format))
-        
-        # Comments (gray)
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor(128, 128, 128))  # Gray
-        comment_format.setFontItalic(True)
-        
-        comment_pattern = QRegularExpression(r'#.*$')
-        self.highlighting_rules.append((comment_pattern, comment_format))
-        
-        # Function definitions (dark blue)
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor(0, 0, 139))  # Dark blue
-        function_format.setFontWeight(QFont.Weight.Bold)
-        
-        function_pattern = QRegularExpression(r'\bdef\s+([a-zA-Z_][a-zA-Z0-9_]*)')
-        self.highlighting_rules.append((function_pattern, function_format))
-        
-        # Class definitions (dark cyan)
-        class_format = QTextCharFormat()
-        class_format.setForeground(QColor(0, 139, 139))  # Dark cyan
-        class_format.setFontWeight(QFont.Weight.Bold)
-        
-        class_pattern = QRegularExpression(r'\bclass\s+([a-zA-Z_][a-zA-Z0-9_]*)')
-        self.highlighting_rules.append((class_pattern, class_format))
-        
-        # Mathematical module names (dark blue)
-        module_format = QTextCharFormat()
-        module_format.setForeground(QColor(0, 0, 139))  # Dark blue
-        module_format.setFontWeight(QFont.Weight.Bold)
-        
-        math_modules = ['math', 'np', 'numpy', 'sp', 'scipy', 'sym', 'sympy']
-        for module in math_modules:
-            pattern = QRegularExpression(f'\\b{module}\\.')
-            self.highlighting_rules.append((pattern, module_format))
-        
-        # Operators (black)
-        operator_format = QTextCharFormat()
-        operator_format.setForeground(QColor(0, 0, 0))  # Black
-        
-        operators = [
-            '=', '==', '!=', '<', '<=', '>', '>=',
-            '\\+', '-', '\\*', '/', '//', '%', '\\*\\*',
-            '\\+=', '-=', '\\*=', '/=', '//=', '%=', '\\*\\*=',
-            '&', '\\|', '\\^', '~', '<<', '>>', '&=', '\\|=', '\\^=',
-            '<<=', '>>=', 'and', 'or', 'not', 'in', 'is'
-        ]
-        
-        for op in operators:
-            pattern = QRegularExpression(f'\\s*{op}\\s*')
-            self.highlighting_rules.append((pattern, operator_format))
-        
-        # Parentheses, brackets, braces (dark orange)
-        bracket_format = QTextCharFormat()
-        bracket_format.setForeground(QColor(255, 140, 0))  # Dark orange
-        bracket_format.setFontWeight(QFont.Weight.Bold)
-        
-        bracket_pattern = QRegularExpression(r'[\(\)\[\]\{\}]')
-        self.highlighting_rules.append((bracket_pattern, bracket_format))
-        
-        # Self keyword (blue)
-        self_format = QTextCharFormat()
-        self_format.setForeground(QColor(0, 0, 255))  # Blue
-        self_format.setFontWeight(QFont.Weight.Bold)
-        
-        self_pattern = QRegularExpression(r'\bself\b')
-        self.highlighting_rules.append((self_pattern, self_format))
+        self.set_rule_formats(_theme_formats(tuple(LIGHT_COLORS.items())))
     
     def setup_custom_theme(self, colors):
         """Setup highlighting rules with custom colors"""
-        self.highlighting_rules = []
-        
-        # Keywords
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(colors['keyword'])
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        
-        keywords = [
-            'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
-            'del', 'elif', 'else', 'except', 'exec', 'finally', 'for',
-            'from', 'global', 'if', 'import', 'in', 'is', 'lambda',
-            'not', 'or', 'pass', 'print', 'raise', 'return', 'try',
-            'while', 'with', 'yield', 'True', 'False', 'None'
-        ]
-        
-        for keyword in keywords:
-            pattern = QRegularExpression(f'\\b{keyword}\\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # Numbers
-        number_format = QTextCharFormat()
-        number_format.setForeground(colors['number'])
-        
-        number_pattern = QRegularExpression(r'\b\d+\.?\d*([eE][+-]?\d+)?\b')
-        self.highlighting_rules.append((number_pattern, number_format))
-        
-        # Strings
-        string_format = QTextCharFormat()
-        string_format.setForeground(colors['string'])
-        
-        single_quote_pattern = QRegularExpression(r"'[^'\\]*(\\.[^'\\]*)*'")
-        self.highlighting_rules.append((single_quote_pattern, string_format))
-        
-        double_quote_pattern = QRegularExpression(r'"[^"\\]*(\\.[^"\\]*)*"')
-        self.highlighting_rules.append((double_quote_pattern, string_format))
-        
-        # Comments
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(colors['comment'])
-        comment_format.setFontItalic(True)
-        
-        comment_pattern = QRegularExpression(r'#.*$')
-        self.highlighting_rules.append((comment_pattern, comment_format))
+        self.set_rule_formats(_theme_formats(tuple(
+            (category, colors[category].getRgb())
+            for category in ('keyword', 'number', 'string', 'comment')
+        )))
         
         # Rehighlight the document
         self.rehighlight()
     
+    def highlight_deferred_blocks(self, first, last):
+        """Highlight the deferred blocks near the visible range"""
+        block = self.document().findBlockByNumber(max(0, first - HIGHLIGHT_MARGIN))
+        end = last + HIGHLIGHT_MARGIN
+        while block.isValid() and block.blockNumber() <= end:
+            if block.userState() == DEFERRED_STATE:
+                self.rehighlightBlock(block)
+            block = block.next()
+    
     def highlightBlock(self, text):
         """Apply syntax highlighting to a block of text"""
-        # Apply all highlighting rules
-        for pattern, format in self.highlighting_rules:
-            expression = pattern
-            match_iterator = expression.globalMatch(text)
-            
+        if self._editor is not None:
+            first, last = self._editor.visible_block_range
+            number = self.currentBlock().blockNumber()
+            if not first - HIGHLIGHT_MARGIN <= number <= last + HIGHLIGHT_MARGIN:
+                # Large pastes or file loads skip the off-screen blocks
+                self.setCurrentBlockState(DEFERRED_STATE)
+                return
+            self.setCurrentBlockState(-1)
+        
+        # Formats depend only on the block text, so identical lines reuse the
+        # spans found the first time instead of rerunning every pattern
+        spans = self._span_cache.get(text)
+        if spans is None:
+            spans = []
+            group_formats = self.group_formats
+            identifier_group = self.identifier_group
+            word_formats = self.word_formats
+            match_iterator = self.token_regex.globalMatch(text)
             while match_iterator.hasNext():
                 match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+                # The deepest group that took part in the match identifies
+                # the token's category
+                group = match.lastCapturedIndex()
+                if group == identifier_group:
+                    format = word_formats.get(match.captured(group))
+                else:
+                    format = group_formats[group]
+                if format is None:
+                    continue
+                start = match.capturedStart()
+                length = match.capturedLength()
+                # Merge with the previous span when it ends right here with the
+                # same format (e.g. ``))`` or ``**-``), saving a setFormat call
+                if spans and spans[-1][2] is format and sum(spans[-1][:2]) == start:
+                    spans[-1] = (spans[-1][0], spans[-1][1] + length, format)
+                else:
+                    spans.append((start, length, format))
+            if len(self._span_cache) >= SPAN_CACHE_SIZE:
+                self._span_cache.clear()
+            self._span_cache[text] = spans
+        
+        for start, length, format in spans:
+            self.setFormat(start, length, format)
@@ -439,7 +439,7 @@ expand(expr)
                 return
             
             # Parse the expression
-            expr = sympify(expr_text)
+            expr = sym.sympify(expr_text)
             
             # Apply operation
             if operation == "collect":
@@ -447,30 +447,30 @@ expand(expr)
                 if not collect_var:
                     self.manip_output.setText("Please specify a variable to collect")
                     return
-                var_sym = symbols(collect_var)
-                result = collect(expr, var_sym)
+                var_sym = sym.symbols(collect_var)
+                result = sym.collect(expr, var_sym)
             elif operation == "expand":
-                result = expand(expr)
+                result = sym.expand(expr)
             elif operation == "factor":
-                result = factor(expr)
+                result = sym.factor(expr)
             elif operation == "simplify":
-                result = simplify(expr)
+                result = sym.simplify(expr)
             elif operation == "together":
-                result = together(expr)
+                result = sym.together(expr)
             elif operation == "apart":
-                result = apart(expr)
+                result = sym.apart(expr)
             elif operation == "cancel":
-                result = cancel(expr)
+                result = sym.cancel(expr)
             elif operation == "trigsimp":
-                result = trigsimp(expr)
+                result = sym.trigsimp(expr)
             elif operation == "expand_trig":
-                result = expand_trig(expr)
+                result = sym.expand_trig(expr)
             elif operation == "powsimp":
-                result = powsimp(expr)
+                result = sym.powsimp(expr)
             elif operation == "expand_log":
-                result = expand_log(expr)
+                result = sym.expand_log(expr)
             elif operation == "ratsimp":
-                result = ratsimp(expr)
+                result = sym.ratsimp(expr)
             else:
                 self.manip_output.setText(f"Unknown operation: {operation}")
                 return
@@ -502,7 +502,7 @@ expand(expr)
                 return
             
             vars_list = [v.strip() for v in var_text.replace(',', ' ').split()]
-            vars_symbols = symbols(' '.join(vars_list))
+            vars_symbols = sym.symbols(' '.join(vars_list))
             if not isinstance(vars_symbols, tuple):
                 vars_symbols = (vars_symbols,)
             
@@ -528,10 +528,10 @@ expand(expr)
                 try:
                     # Check if it's already an Eq expression
                     if 'Eq(' in eq:
-                        parsed_eqs.append(sympify(eq))
+                        parsed_eqs.append(sym.sympify(eq))
                     else:
                         # Assume it's an expression equal to 0
-                        parsed_eqs.append(sympify(eq))
+                        parsed_eqs.append(sym.sympify(eq))
                 except:
                     self.solve_output.setText(f"Error parsing equation: {eq}")
                     return
@@ -539,16 +539,16 @@ expand(expr)
             # Solve based on type
             if solver_type == "solve":
                 if len(parsed_eqs) == 1:
-                    solution = solve(parsed_eqs[0], vars_symbols)
+                    solution = sym.solve(parsed_eqs[0], vars_symbols)
                 else:
-                    solution = solve(parsed_eqs, vars_symbols)
+                    solution = sym.solve(parsed_eqs, vars_symbols)
             elif solver_type == "solveset":
                 if len(parsed_eqs) != 1:
                     self.solve_output.setText("solveset works with single equations only")
                     return
-                solution = solveset(parsed_eqs[0], vars_symbols[0])
+                solution = sym.solveset(parsed_eqs[0], vars_symbols[0])
             elif solver_type == "linsolve":
-                solution = linsolve(parsed_eqs, vars_symbols)
+                solution = sym.linsolve(parsed_eqs, vars_symbols)
             else:
                 self.solve_output.setText(f"Unknown solver: {solver_type}")
                 return
@@ -3,6 +3,21 @@ Code editor with line numbers and inline results
 """
 
 from ..core.imports import *
+from PySide6.QtCore import QEvent, QPoint, Signal
+from PySide6.QtGui import QPen, QStaticText, QTextBlockUserData
+
+
+# Number of distinct result texts whose laid-out QStaticText is kept around
+STATIC_TEXT_CACHE_SIZE = 1024
+
+
+class LineWidthData(QTextBlockUserData):
+    """Pixel width of a block's text, used to place its inline result"""
+    
+    def __init__(self, width, font_generation):
+        super().__init__()
+        self.width = width
+        self.font_generation = font_generation
 
 
 class LineNumberArea(QWidget):
@@ -22,14 +37,28 @@ class LineNumberArea(QWidget):
 class CodeEditor(QPlainTextEdit):
     """Custom text editor with line numbers and inline results"""
     
+    # Emitted with the first and last block numbers on screen when they change
+    visible_blocks_changed = Signal(int, int)
+    
     def __init__(self):
         super().__init__()
         self.line_number_area = LineNumberArea(self)
-        self.line_results = {}  # Store results for each line
+        # Indexed by block number: (result, QStaticText drawn after the line)
+        # or None
+        self.line_results = []
+        self._line_number_strings = []
+        self._line_number_width_cache = (-1, 0)  # (block count, width)
+        self.visible_block_range = (0, 0)
+        self._font_generation = 0  # Bumped on font change to expire LineWidthData
+        self._result_pen = QPen(QColor(0, 150, 0))  # Green for results
+        self._static_text_cache = {}  # result text -> QStaticText
+        self.update_font_metrics()
         
         # Connect signals
         self.blockCountChanged.connect(self.update_line_number_area_width)
+        self.blockCountChanged.connect(self.trim_line_results)
         self.updateRequest.connect(self.update_line_number_area)
+        self.document().contentsChange.connect(self.invalidate_line_widths)
         
         # Set initial width
         self.update_line_number_area_width(0)
@@ -40,15 +69,33 @@ class CodeEditor(QPlainTextEdit):
         
     def line_number_area_width(self):
         """Calculate width needed for line number area"""
-        digits = 1
-        max_block = max(1, self.blockCount())
-        while max_block >= 10:
-            max_block //= 10
-            digits += 1
+        block_count = self.blockCount()
+        cached_count, cached_width = self._line_number_width_cache
+        if block_count == cached_count:
+            return cached_width
         
+        digits = len(str(max(1, block_count)))
         space = 10 + self.fontMetrics().horizontalAdvance('9') * digits
+        self._line_number_width_cache = (block_count, space)
         return space
     
+    def changeEvent(self, event):
+        """Refresh the cached font measurements when the font changes"""
+        if event.type() == QEvent.Type.FontChange:
+            self._line_number_width_cache = (-1, 0)
+            self._font_generation += 1
+            self._static_text_cache.clear()
+            self.update_font_metrics()
+            self.update_line_number_area_width(0)
+        super().changeEvent(event)
+    
+    def update_font_metrics(self):
+        """Remember the font measurements used by the paint methods"""
+        font_metrics = self.fontMetrics()
+        self._line_height = font_metrics.height()
+        # drawStaticText positions the top of the text, not its baseline
+        self._result_text_offset = font_metrics.height() - 3 - font_metrics.ascent()
+    
     def update_line_number_area_width(self, new_block_count):
         """Update the viewport margins for line numbers"""
         self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
@@ -62,6 +109,17 @@ class CodeEditor(QPlainTextEdit):
         
         if rect.contains(self.viewport().rect()):
             self.update_line_number_area_width(0)
+        # Scrolling and relayouts (e.g. after a paste) update the whole view
+        if dy or rect.contains(self.viewport().rect()):
+            self.update_visible_block_range()
+    
+    def update_visible_block_range(self):
+        """Track which blocks are on screen, emitting visible_blocks_changed"""
+        first = self.firstVisibleBlock().blockNumber()
+        last = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+        if (first, last) != self.visible_block_range:
+            self.visible_block_range = (first, last)
+            self.visible_blocks_changed.emit(first, last)
     
     def resizeEvent(self, event):
         """Handle resize events"""
@@ -69,72 +127,173 @@ class CodeEditor(QPlainTextEdit):
         
         cr = self.contentsRect()
         self.line_number_area.setGeometry(cr.left(), cr.top(), self.line_number_area_width(), cr.height())
+        self.update_visible_block_range()
     
     def line_number_area_paint_event(self, event):
         """Paint the line numbers"""
         painter = QPainter(self.line_number_area)
         painter.fillRect(event.rect(), QColor(240, 240, 240))
+        painter.setPen(QColor(120, 120, 120))
         
         block = self.firstVisibleBlock()
         block_number = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        bottom = top + self.blockBoundingRect(block).height()
         
-        height = self.fontMetrics().height()
+        # Loop invariants
+        height = self._line_height
+        text_width = self.line_number_area.width() - 5
+        align = Qt.AlignmentFlag.AlignRight
+        rect_top = event.rect().top()
+        rect_bottom = event.rect().bottom()
+        numbers = self.line_number_strings()
+        block_bounding_rect = self.blockBoundingRect
+        draw_text = painter.drawText
+        
+        # Without wrapping every block after the first (which also holds the
+        # document margin) is one line high, so it is measured only once
+        line_height = None
+        if self.lineWrapMode() == QPlainTextEdit.LineWrapMode.NoWrap and block.next().isValid():
+            line_height = block_bounding_rect(block.next()).height()
         
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
-                painter.setPen(QColor(120, 120, 120))
-                painter.drawText(0, int(top), self.line_number_area.width() - 5, height,
-                               Qt.AlignmentFlag.AlignRight, number)
+        while block.isValid() and top <= rect_bottom:
+            # Hidden blocks take no space, so they are stepped over without
+            # asking the layout for their size
+            if block.isVisible():
+                if line_height is None or block_number == 0:
+                    bottom = top + block_bounding_rect(block).height()
+                else:
+                    bottom = top + line_height
+                if bottom >= rect_top:
+                    draw_text(0, int(top), text_width, height, align, numbers[block_number])
+                top = bottom
             
             block = block.next()
-            top = bottom
-            bottom = top + self.blockBoundingRect(block).height()
             block_number += 1
     
+    def invalidate_line_widths(self, position, chars_removed, chars_added):
+        """Forget the cached text widths of the blocks touched by an edit"""
+        document = self.document()
+        block = document.findBlock(position)
+        last = document.findBlock(position + chars_added)
+        while block.isValid():
+            block.setUserData(None)
+            if block == last:
+                break
+            block = block.next()
+    
+    def line_number_strings(self):
+        """Line number labels, rebuilt only when the block count changes"""
+        count = self.blockCount()
+        if len(self._line_number_strings) != count:
+            self._line_number_strings = [str(n) for n in range(1, count + 1)]
+        return self._line_number_strings
+    
     def paintEvent(self, event):
         """Custom paint event to draw inline results"""
         super().paintEvent(event)
         
+        line_results = self.line_results
+        result_count = len(line_results)
+        if not result_count:
+            return
+        
         # Draw inline results
-        painter = QPainter(self.viewport())
-        painter.setPen(QColor(0, 150, 0))  # Green for results
+        viewport = self.viewport()
+        painter = QPainter(viewport)
+        painter.setPen(self._result_pen)
         
         block = self.firstVisibleBlock()
         block_number = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        bottom = top + self.blockBoundingRect(block).height()
-        
-        height = self.fontMetrics().height()
-        
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                # Draw inline result if available
-                if block_number + 1 in self.line_results:
-                    result = self.line_results[block_number + 1]
-                    result_text = f" = {result}"
-                    
-                    # Calculate position at end of line text
-                    text_width = self.fontMetrics().horizontalAdvance(block.text())
-                    result_x = text_width + 20  # Add some padding
-                    
-                    # Make sure it fits in the viewport
-                    if result_x < self.viewport().width() - 200:
-                        painter.drawText(int(result_x), int(top + height - 3), result_text)
+        
+        # Loop invariants
+        font_metrics = self.fontMetrics()
+        text_offset = self._result_text_offset
+        max_x = viewport.width() - 200
+        rect_top = event.rect().top()
+        rect_bottom = event.rect().bottom()
+        font_generation = self._font_generation
+        block_bounding_rect = self.blockBoundingRect
+        draw_static_text = painter.drawStaticText
+        
+        while block.isValid() and top <= rect_bottom:
+            if not block.isVisible():
+                # Hidden blocks take no space and have nothing to draw
+                block = block.next()
+                block_number += 1
+                continue
+            bottom = top + block_bounding_rect(block).height()
+            result = line_results[block_number] if block_number < result_count else None
+            # Only lines with a result need their text measured
+            if result is not None and bottom >= rect_top:
+                # Calculate position at end of line text; shaping the text is
+                # the expensive part, so the width is kept on the block until
+                # its text or the font changes
+                width_data = block.userData()
+                if width_data is None or width_data.font_generation != font_generation:
+                    width_data = LineWidthData(font_metrics.horizontalAdvance(block.text()), font_generation)
+                    block.setUserData(width_data)
+                result_x = width_data.width + 20  # Add some padding
+                
+                # Make sure it fits in the viewport
+                if result_x < max_x:
+                    draw_static_text(int(result_x), int(top + text_offset), result[1])
             
             block = block.next()
             top = bottom
-            bottom = top + self.blockBoundingRect(block).height()
             block_number += 1
     
     def set_line_result(self, line_number, result):
         """Set the result for a specific line"""
-        self.line_results[line_number] = result
-        self.update()  # Trigger repaint
+        index = line_number - 1
+        if index >= len(self.line_results):
+            self.line_results.extend([None] * (index + 1 - len(self.line_results)))
+        self.line_results[index] = self.result_entry(result)
+        self.update_line(line_number)  # Trigger repaint
+    
+    def set_line_results(self, results):
+        """Replace all results at once from a dict of line number -> result.
+        
+        The text area is repainted once instead of line by line.
+        """
+        line_results = [None] * max(results, default=0)
+        for line_number, result in results.items():
+            line_results[line_number - 1] = self.result_entry(result)
+        self.line_results = line_results
+        self.viewport().update()
+    
+    def result_entry(self, result):
+        """The (result, QStaticText) pair stored in line_results"""
+        # Formatted and laid out once here rather than on every repaint;
+        # common results such as " = 0" share one QStaticText
+        text = f" = {result}"
+        static_text = self._static_text_cache.get(text)
+        if static_text is None:
+            if len(self._static_text_cache) >= STATIC_TEXT_CACHE_SIZE:
+                self._static_text_cache.clear()
+            static_text = QStaticText(text)
+            static_text.setTextFormat(Qt.TextFormat.PlainText)
+            self._static_text_cache[text] = static_text
+        return (result, static_text)
     
     def clear_line_results(self):
         """Clear all inline results"""
+        for index, result in enumerate(self.line_results):
+            if result is not None:
+                self.update_line(index + 1)
         self.line_results.clear()
-        self.update()
+    
+    def trim_line_results(self, block_count):
+        """Drop results of lines that no longer exist"""
+        del self.line_results[block_count:]
+    
+    def update_line(self, line_number):
+        """Schedule a repaint of one (1-based) line of the text area"""
+        block = self.document().findBlockByNumber(line_number - 1)
+        if not block.isValid() or not block.isVisible():
+            return
+        rect = self.blockBoundingGeometry(block).translated(self.contentOffset())
+        viewport = self.viewport()
+        if rect.bottom() < 0 or rect.top() > viewport.height():
+            return  # Painted when scrolled into view
+        viewport.update(0, int(rect.top()), viewport.width(), int(rect.height()) + 1)
@@ -0,0 +1,17 @@
+"""
+Shared fixtures for the calculator tests
+"""
+
+import os
+
+import pytest
+
+# The widgets are only created, never shown
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """The QApplication every Qt test runs under"""
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(["calc-tests"])
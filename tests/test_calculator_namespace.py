@@ -0,0 +1,105 @@
+"""
+Tests for the calculation namespace of the document calculator
+"""
+
+import importlib
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.calculator import LazyNamespace, ScientificCalculator
+
+
+@pytest.fixture
+def calculator():
+    """Just the namespace state of a ScientificCalculator, without its window"""
+    calculator = SimpleNamespace()
+    ScientificCalculator.setup_calculation_namespace(calculator)
+    return calculator
+
+
+def evaluate(calculator, source):
+    return ScientificCalculator.evaluate_expression(calculator, source)
+
+
+@pytest.mark.parametrize("name, module_name, attribute", [
+    ("np", "numpy", None),
+    ("array", "numpy", "array"),
+    ("sym", "sympy", None),
+    ("Symbol", "sympy", "Symbol"),
+    ("sym_integrate", "sympy", "integrate"),
+    ("linalg", "scipy.linalg", None),
+])
+def test_library_names_resolve_on_first_use(calculator, name, module_name, attribute):
+    namespace = calculator.namespace
+    assert name in namespace
+    assert not dict.__contains__(namespace, name)
+    
+    expected = importlib.import_module(module_name)
+    if attribute is not None:
+        expected = getattr(expected, attribute)
+    assert namespace[name] is expected
+    # Cached in the dict, so later lookups skip __missing__
+    assert dict.__contains__(namespace, name)
+
+
+def test_expressions_import_library_names(calculator):
+    assert evaluate(calculator, "np.array([1, 2, 3]).sum()") == 6
+    assert str(evaluate(calculator, "expand((Symbol('a') + 1)**2)")) == "a**2 + 2*a + 1"
+    assert evaluate(calculator, "math.floor(2.5)") == 2
+    assert calculator.namespace["math"] is math
+
+
+def test_user_assignments_shadow_library_names(calculator):
+    calculator.namespace["np"] = 5
+    calculator.namespace["sqrt"] = lambda x: -x
+    assert evaluate(calculator, "np + 1") == 6
+    assert evaluate(calculator, "sqrt(4)") == -4
+
+
+def test_each_recalculation_starts_from_the_defaults(calculator):
+    calculator.namespace["np"] = 5
+    namespace = calculator.base_namespace.copy()
+    assert isinstance(namespace, LazyNamespace)
+    assert not dict.__contains__(namespace, "np")
+    assert namespace["np"].__name__ == "numpy"
+    # Resolving a name in one copy leaves the read-only defaults alone
+    assert not dict.__contains__(calculator.base_namespace.copy(), "np")
+
+
+def test_unknown_names_are_missing(calculator):
+    assert "x" not in calculator.namespace
+    with pytest.raises(KeyError):
+        calculator.namespace["x"]
+
+
+@pytest.mark.parametrize("source, name", [
+    ("x", "x"),
+    ("x + 1", "x"),
+    ("sin(1)", "sin"),
+    ("[y for y in range(3)] + z", "z"),
+    ("f(lambda t: t)", "f"),
+])
+def test_undefined_names_raise_the_eval_error(calculator, source, name):
+    with pytest.raises(NameError) as eval_error:
+        eval(source, {"__builtins__": {}}, dict(calculator.namespace))
+    with pytest.raises(NameError) as checked_error:
+        evaluate(calculator, source)
+    assert str(checked_error.value) == str(eval_error.value) == f"name '{name}' is not defined"
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("[y * 2 for y in range(3)]", [0, 2, 4]),
+    ("(lambda t: t + 1)(2)", 3),
+    ("(n := 4) * n", 16),
+])
+def test_names_bound_by_the_expression_are_defined(calculator, source, expected):
+    assert evaluate(calculator, source) == expected
+
+
+def test_names_assigned_earlier_are_defined(calculator):
+    with pytest.raises(NameError):
+        evaluate(calculator, "x * 2")
+    calculator.namespace["x"] = 21
+    assert evaluate(calculator, "x * 2") == 42
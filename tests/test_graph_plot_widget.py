@@ -0,0 +1,46 @@
+"""
+Tests for the plot expression backends
+"""
+
+import numpy as np
+import pytest
+
+from src.widgets import graph_plot_widget
+from src.widgets.graph_plot_widget import _compile_plot_expr
+
+
+@pytest.fixture
+def numba_for_small_plots(monkeypatch):
+    """Let the Numba kernels handle the few points these tests plot"""
+    if not graph_plot_widget.NUMBA_AVAILABLE:
+        pytest.skip("numba is not installed")
+    monkeypatch.setattr(graph_plot_widget, 'NUMBA_MIN_POINTS', 1)
+
+
+def check_negative_powers():
+    x = np.linspace(0.0, 10.0, 11)
+    y = _compile_plot_expr('x**-1')(x)
+    assert y.shape == x.shape
+    assert np.isinf(y[0])
+    np.testing.assert_allclose(y[1:], 1.0 / x[1:])
+    
+    x = np.linspace(-5.0, 5.0, 11)
+    y = _compile_plot_expr('x**-2')(x)
+    assert np.isinf(y[5])
+    np.testing.assert_allclose(np.delete(y, 5), np.delete(x, 5) ** -2.0)
+
+
+def test_negative_power_over_range_containing_zero():
+    check_negative_powers()
+
+
+def test_negative_power_over_range_containing_zero_with_numba(numba_for_small_plots):
+    check_negative_powers()
+    assert graph_plot_widget._compile_numba_expr('x**-1') is not None
+
+
+def test_small_plots_do_not_compile_numba_kernels():
+    compiled = graph_plot_widget._compile_numba_expr.cache_info().currsize
+    y = _compile_plot_expr('x**3 + 1')(np.linspace(-1.0, 1.0, 1000))
+    assert y[0] == 0.0
+    assert graph_plot_widget._compile_numba_expr.cache_info().currsize == compiled
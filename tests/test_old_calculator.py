@@ -0,0 +1,240 @@
+"""
+Tests for the document calculation of the legacy calculator
+"""
+
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+spec = importlib.util.spec_from_file_location(
+    "old_calculator", Path(__file__).resolve().parent.parent / "old" / "calculator.py")
+old_calculator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(old_calculator)
+
+
+ScientificCalculator = old_calculator.ScientificCalculator
+
+
+class Document:
+    """The calculation state of a ScientificCalculator, without its window"""
+    
+    setup_calculation_namespace = ScientificCalculator.setup_calculation_namespace
+    recalculate_changed_lines = ScientificCalculator.recalculate_changed_lines
+    process_multiline_statements = ScientificCalculator.process_multiline_statements
+    execute_multiline_code = ScientificCalculator.execute_multiline_code
+    format_result = ScientificCalculator.format_result
+    update_inline_results = ScientificCalculator.update_inline_results
+    update_variables_display = ScientificCalculator.update_variables_display
+    
+    def __init__(self, **names):
+        self.decimal_precision = 6
+        self.variables = {}
+        self.line_results = {}
+        self.last_calculation = None
+        self.history = []
+        self.history_widget = SimpleNamespace(add_calculations=self.history.extend)
+        self.variables_widget = None
+        self.setup_calculation_namespace()
+        self.base_namespace.update(names)
+    
+    def calculate(self, text):
+        editor = SimpleNamespace(toPlainText=lambda: text, set_line_results=lambda results: None)
+        self.recalculate_changed_lines(editor)
+        return self.line_results
+
+
+def calculate(text, **names):
+    return Document(**names).calculate(text)
+
+
+def process(text):
+    # process_multiline_statements does not use the window's state
+    return ScientificCalculator.process_multiline_statements(None, text.split('\n'))
+
+
+def test_header_followed_by_comment_starts_block():
+    items = process("match cmd:  # dispatch\n    case 2:\n        r = 10\nr")
+    assert [item['is_multiline'] for item in items] == [True, False]
+    assert items[1]['line_num'] == 3
+
+
+def test_string_containing_colon_and_hash_is_not_a_header():
+    items = process("s = 'a: #b'\n  t = 1\nu = 2")
+    assert [(item['line_num'], item['is_multiline']) for item in items] == [
+        (0, False), (1, False), (2, False)]
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("a = 1", (('a',), '1')),
+    ("a = b = 1", (('a', 'b'), '1')),
+    ("  total = (x + 1) * 2  ", (('total',), '(x + 1) * 2')),
+    ("a == 2", None),
+    ("a <= 3", None),
+    ("a >= 3", None),
+    ("a != 3", None),
+    ("round(x, ndigits=1)", None),
+    ("f(a=b == c)", None),
+    ("a, b = 1, 2", None),
+    ("a[0] = 1", None),
+    ("a += 1", None),
+    ("(n := 2)", None),
+])
+def test_parse_assignment(source, expected):
+    assert old_calculator._parse_assignment(source) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a = b = 3\na + b", {0: "a = b = 3", 1: "6"}),
+    ("a = 2\na == 2", {0: "a = 2", 1: "True"}),
+    ("a = 2\na <= 1", {0: "a = 2", 1: "False"}),
+    ("a = 2\na != 1 >= 0", {0: "a = 2", 1: "True"}),
+    ("x = 2.25\nround(x, ndigits=1)", {0: "x = 2.25", 1: "2.2"}),
+    ("a = (1", {0: "Error: '(' was never closed (<string>, line 1)"}),
+])
+def test_assignments_and_comparisons(text, expected):
+    assert calculate(text) == expected
+
+
+def test_comparisons_do_not_define_variables():
+    document = Document()
+    document.calculate("a = 2\na == 2\na <= 3")
+    assert document.variables == {'a': 2}
+
+
+@pytest.mark.parametrize("text, expected, calls", [
+    # A block that is one expression shows its value
+    ("{'now':\n    tick()}['now']", "1", 1),
+    ("tick() + tick()  # two ticks:", "3", 2),
+    # Compound statements run their body as written and show no value
+    ("if True:\n    tick()", "executed", 1),
+    ("if True:\n    tick()\nelse:\n    tick() * 10", "executed", 1),
+    ("for i in range(3):\n    tick()", "executed", 3),
+    ("def f():\n    return tick()", "executed", 0),
+])
+def test_block_expressions_run_once(text, expected, calls):
+    ticks = []
+    
+    def tick():
+        ticks.append(None)
+        return len(ticks)
+    
+    assert calculate(text, tick=tick) == {0: expected}
+    assert len(ticks) == calls
+
+
+@pytest.mark.parametrize("values, expected", [
+    # Zeros compare equal but display differently
+    ((0.0, -0.0, 0, False), ["0", "-0", "0", "False"]),
+    ((-0.0, 0.0), ["-0", "0"]),
+    (([0.0, -0.0, 0],), ["[0, -0, 0]"]),
+    ((complex(0.0, 0.0), complex(-0.0, 0.0)), ["0", "-0"]),
+    # Equal ints, floats and bools are cached separately
+    ((1, 1.0, True), ["1", "1", "True"]),
+    ((True, 1, 1.0), ["True", "1", "1"]),
+    ((2.5, 2, 2.0), ["2.5", "2", "2"]),
+    ((1e12, 10**12), ["1.000000e+12", "1000000000000"]),
+    ((1e-5, 1e-4), ["1.000000e-05", "0.0001"]),
+    ((1 + 2j, 3j, 2 + 0j), ["(1+2j)", "3j", "2"]),
+])
+def test_format_result(values, expected):
+    document = Document()
+    assert [document.format_result(value) for value in values] == expected
+
+
+def test_format_result_uses_the_precision():
+    document = Document()
+    assert document.format_result(2 / 3) == "0.666667"
+    document.decimal_precision = 3
+    assert document.format_result(2 / 3) == "0.667"
+    assert document.format_result(1e-5) == "1.000e-05"
+
+
+@pytest.mark.parametrize("text, expected", [
+    # The next statement at column 0 closes a block
+    ("def f(x):\n    return x * 2\nf(4)",
+     [(0, True, "def f(x):\n    return x * 2"), (2, False, "f(4)")]),
+    ("for i in range(3):\n    total = i\n\nx = 1",
+     [(0, True, "for i in range(3):\n    total = i"), (3, False, "x = 1")]),
+    # Comment and blank lines inside a block belong to it
+    ("if a:\n    # note\n\n    b = 1\nc = 2",
+     [(0, True, "if a:\n    # note\n\n    b = 1"), (4, False, "c = 2")]),
+    # A comment at column 0 does not close the block either
+    ("while n:\n# halve\n    n //= 2\nn",
+     [(0, True, "while n:\n# halve\n    n //= 2"), (3, False, "n")]),
+    # Clauses continue the block at the same indentation
+    ("if a:\n    b = 1\nelif c:\n    b = 2\nelse:\n    b = 3\nb",
+     [(0, True, "if a:\n    b = 1\nelif c:\n    b = 2\nelse:\n    b = 3"), (6, False, "b")]),
+    ("try:\n    x = 1 / 0\nexcept ZeroDivisionError:\n    x = 0\nfinally:\n    y = 1\nx",
+     [(0, True, "try:\n    x = 1 / 0\nexcept ZeroDivisionError:\n    x = 0\nfinally:\n    y = 1"),
+      (6, False, "x")]),
+    # A ':' before a trailing comment still ends a header
+    ("if a:  # check\n    b = 1\nb",
+     [(0, True, "if a:  # check\n    b = 1"), (2, False, "b")]),
+    ("match a:  # dispatch\n    case 1:\n        b = 1\nb",
+     [(0, True, "match a:  # dispatch\n    case 1:\n        b = 1"), (3, False, "b")]),
+    # ... but not a ':' or '#' inside a string, or a commented-out header
+    ("s = 'if a: # x'\n    t = 1",
+     [(0, False, "s = 'if a: # x'"), (1, False, "    t = 1")]),
+    ("# if a:\nb = 1",
+     [(0, False, "# if a:"), (1, False, "b = 1")]),
+    # Back to back blocks
+    ("def f():\n    return 1\ndef g():\n    return 2",
+     [(0, True, "def f():\n    return 1"), (2, True, "def g():\n    return 2")]),
+    # A block still open at the end of the document
+    ("x = 1\nwith open(p) as f:\n    data = f.read()\n",
+     [(0, False, "x = 1"), (1, True, "with open(p) as f:\n    data = f.read()")]),
+])
+def test_blocks_split_on_indentation(text, expected):
+    assert [(item['line_num'], item['is_multiline'], item['code']) for item in process(text)] == expected
+
+
+def test_statement_after_a_block_runs_on_its_own():
+    assert calculate("def f(x):\n    return x * 2\nf(4)") == {0: "executed", 2: "8"}
+
+
+@pytest.fixture
+def history_panel(qapp):
+    return old_calculator.HistoryPanel()
+
+
+def history_entries(panel):
+    entries = [(item['expression'], item['result']) for item in panel.history]
+    assert [panel.history_list.item(i).text() for i in range(panel.history_list.count())] == [
+        f"{expression} = {result}" for expression, result in entries]
+    return entries
+
+
+@pytest.mark.parametrize("batches, expected", [
+    ([[("a", "1"), ("a", "1"), ("b", "2")]], [("a", "1"), ("b", "2")]),
+    # Only a repeat of the most recent entry is dropped
+    ([[("a", "1"), ("b", "2"), ("a", "1")]], [("a", "1"), ("b", "2"), ("a", "1")]),
+    ([[("a", "1")], [("a", "1")], [("a", "2")]], [("a", "1"), ("a", "2")]),
+    ([[("a", "1"), ("b", "2")], [("b", "2"), ("c", "3")]], [("a", "1"), ("b", "2"), ("c", "3")]),
+    ([[("a", "1")], [], [("a", "1")]], [("a", "1")]),
+])
+def test_history_skips_consecutive_duplicates(history_panel, batches, expected):
+    for calculations in batches:
+        history_panel.add_calculations(calculations)
+    assert history_entries(history_panel) == expected
+
+
+def test_history_keeps_the_last_100_entries(history_panel):
+    history_panel.add_calculations([(f"x{i}", str(i)) for i in range(60)])
+    history_panel.add_calculation("x59", "59")
+    history_panel.add_calculations([(f"x{i}", str(i)) for i in range(60, 130)])
+    entries = history_entries(history_panel)
+    assert len(entries) == 100
+    assert entries[0] == ("x30", "30") and entries[-1] == ("x129", "129")
+    assert history_panel.history_list.updatesEnabled()
+
+
+def test_history_updates_are_enabled_again_after_an_error(history_panel, monkeypatch):
+    def fail(item):
+        raise RuntimeError("list widget failed")
+    
+    monkeypatch.setattr(history_panel.history_list, "addItem", fail)
+    with pytest.raises(RuntimeError):
+        history_panel.add_calculation("a", "1")
+    assert history_panel.history_list.updatesEnabled()
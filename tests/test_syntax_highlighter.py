@@ -0,0 +1,145 @@
+"""
+Tests for the Python syntax highlighter
+"""
+
+import re
+
+import pytest
+from PySide6.QtGui import QFont, QTextDocument
+
+from src.core.syntax_highlighter import (
+    BUILTINS, DARK_COLORS, DEFERRED_STATE, HIGHLIGHT_MARGIN, KEYWORDS,
+    MATH_MODULES, OPERATORS, PythonSyntaxHighlighter,
+)
+
+
+def per_rule_styles(text):
+    """Style of each character under the original per-rule highlighter.
+
+    Every rule was matched separately and the later rules painted over the
+    earlier ones; this replays those rules with the dark theme colors.
+    """
+    bold = {'bold': True}
+    rules = [(rf'\b{word}\b', 'keyword', bold) for word in KEYWORDS]
+    rules += [(rf'\b{word}\b', 'builtin', {}) for word in BUILTINS]
+    rules += [
+        (r'\b\d+\.?\d*([eE][+-]?\d+)?\b', 'number', {}),
+        (r'\b0[xX][0-9a-fA-F]+\b', 'number', {}),
+        (r'\b0[oO][0-7]+\b', 'number', {}),
+        (r'\b0[bB][01]+\b', 'number', {}),
+        (r"'[^'\\]*(\\.[^'\\]*)*'", 'string', {}),
+        (r'"[^"\\]*(\\.[^"\\]*)*"', 'string', {}),
+        (r"'''.*?'''", 'string', {}),
+        (r'""".*?"""', 'string', {}),
+        (r'#.*$', 'comment', {'italic': True}),
+        (r'\bdef\s+([a-zA-Z_][a-zA-Z0-9_]*)', 'function', bold),
+        (r'\bclass\s+([a-zA-Z_][a-zA-Z0-9_]*)', 'class', bold),
+    ]
+    rules += [(rf'\b{module}\.', 'module', bold) for module in MATH_MODULES]
+    rules += [(rf'\s*{op}\s*', 'operator', {}) for op in OPERATORS]
+    rules += [(r'[\(\)\[\]\{\}]', 'bracket', bold), (r'\bself\b', 'self', bold)]
+    
+    styles = [None] * len(text)
+    for pattern, category, style in rules:
+        for match in re.finditer(pattern, text):
+            for i in range(match.start(), match.end()):
+                styles[i] = (DARK_COLORS[category], style.get('bold', False),
+                             style.get('italic', False))
+    return styles
+
+
+def highlighted_styles(text):
+    """Style of each character of *text* as shown by PythonSyntaxHighlighter"""
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = PythonSyntaxHighlighter(document)
+    highlighter.rehighlight()
+    styles = [None] * len(text)
+    for format_range in document.firstBlock().layout().formats():
+        char_format = format_range.format
+        style = (char_format.foreground().color().getRgb()[:3],
+                 char_format.fontWeight() == QFont.Weight.Bold,
+                 char_format.fontItalic())
+        for i in range(format_range.start, format_range.start + format_range.length):
+            styles[i] = style
+    return styles
+
+
+# Lines on which the combined token regex must paint what the separate rules
+# painted (whitespace aside, which the old operator rules also coloured)
+SAME_AS_PER_RULE = [
+    "x = 42 + 3.5e10",
+    "def f(a, b): return a * b",
+    "class Foo: pass",
+    "y = np.sqrt(2) ** 0x1F - math.pi / sym.oo",
+    "if x >= 10 and y != 0b101: z = abs(x) // 2",
+    "self.value = [1, 2, {3: 0o17}]",
+    "total = sum(range(5))  # total of the range",
+    "name = 'hello' + \"there\"",
+    "while True: x = None",
+    "lambda t: t ** 2 % 7",
+    "max(len('abc'), 2)",
+]
+
+
+@pytest.mark.parametrize("text", SAME_AS_PER_RULE)
+def test_matches_per_rule_highlighting(qapp, text):
+    new = highlighted_styles(text)
+    old = per_rule_styles(text)
+    for i, char in enumerate(text):
+        if not char.isspace():
+            assert new[i] == old[i], f"{text!r} differs at {i} ({char!r})"
+
+
+def category_of(styles, text, fragment):
+    """Colors used for the first occurrence of *fragment*"""
+    i = text.index(fragment)
+    return {styles[j][0] if styles[j] else None for j in range(i, i + len(fragment))}
+
+
+# Tokens the separate rules painted over by mistake
+@pytest.mark.parametrize("text, fragment, category", [
+    # '#' and quotes inside a string are part of the string
+    ("s = 'a # b'  # note", "'a # b'", 'string'),
+    ("s = 'a # b'  # note", "# note", 'comment'),
+    ('t = "x: #1" + "it\'s"', '"x: #1"', 'string'),
+    # Word operators only as whole words
+    ("y in sin(x)", "sin", None),
+    ("y in sin(x)", "in", 'operator'),
+    ("isinstance(v, int) or 0", "isinstance", 'builtin'),
+    # The exponent sign belongs to the number
+    ("d = 1e-3", "1e-3", 'number'),
+])
+def test_tokens_get_one_format(qapp, text, fragment, category):
+    colors = category_of(highlighted_styles(text), text, fragment)
+    assert colors == {DARK_COLORS[category] if category else None}
+
+
+def test_repeated_lines_reuse_spans(qapp):
+    document = QTextDocument()
+    document.setPlainText("a = 1 + 2\na = 1 + 2")
+    highlighter = PythonSyntaxHighlighter(document)
+    highlighter.rehighlight()
+    first, second = document.firstBlock(), document.lastBlock()
+    assert len(highlighter._span_cache) == 1
+    assert [(r.start, r.length) for r in first.layout().formats()] == \
+        [(r.start, r.length) for r in second.layout().formats()]
+
+
+def test_far_blocks_are_highlighted_when_scrolled_to(qapp):
+    from src.widgets.code_editor import CodeEditor
+    
+    editor = CodeEditor()
+    editor.resize(400, 300)
+    highlighter = PythonSyntaxHighlighter(editor.document(), editor)
+    editor.setPlainText("\n".join(f"x{i} = {i}" for i in range(HIGHLIGHT_MARGIN * 6)))
+    far = editor.document().findBlockByNumber(HIGHLIGHT_MARGIN * 5)
+    assert far.userState() == DEFERRED_STATE
+    assert not far.layout().formats()
+    
+    # Scrolling there updates the visible range, which highlights it
+    editor.verticalScrollBar().setValue(far.blockNumber())
+    editor.update_visible_block_range()
+    assert editor.visible_block_range[0] == far.blockNumber()
+    assert far.userState() != DEFERRED_STATE
+    assert far.layout().formats()